@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The modules import each other as top-level modules (from core import *),
+# so make this directory importable before loading the CLI
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cli import main
+
+sys.exit(main())
@@ -0,0 +1,327 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import core
+from sweep import sweep_As_Ds
+
+
+##########################################################
+# Parallel sweep benchmark
+##########################################################
+
+def benchmark_parallel_sweep(size=500, worker_counts=None, chunk_size=16384):
+    """Time sweep_As_Ds on a size x size grid for several worker counts.
+
+    Returns:
+        List of dicts with workers, seconds and speedup relative to 1 worker
+    """
+    if worker_counts is None:
+        cpus = os.cpu_count() or 1
+        worker_counts = [w for w in (1, 2, 4, 8, 16, 32) if w <= cpus]
+
+    As = range(size)
+    Ds = range(size)
+    results = []
+    reference = None
+    for workers in worker_counts:
+        start = time.perf_counter()
+        times, values = sweep_As_Ds(As, Ds, workers=workers, chunk_size=chunk_size)
+        seconds = time.perf_counter() - start
+        if reference is None:
+            reference = (seconds, times, values)
+        elif not ((times == reference[1]).all() and (values == reference[2]).all()):
+            raise AssertionError(f'Sweep with {workers} workers differs from {worker_counts[0]} worker(s)')
+        results.append({'workers': workers, 'seconds': seconds, 'speedup': reference[0] / seconds})
+    return results
+
+
+##########################################################
+# Numeric backend benchmark
+##########################################################
+
+def benchmark_backends(n=20000, max_val=1000, scale=2**70, seed=0):
+    """Throughput of each numeric backend of max_minus_min_batch.
+
+    The int64 tier runs n random inits with entries up to max_val. The object
+    and python tiers run the same inits multiplied by scale, which converge
+    in the same number of steps but need big-integer arithmetic.
+
+    Returns:
+        List of dicts with backend, seconds, inits_per_s and steps_per_s
+    """
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, max_val + 1, size=(n, 3))
+    large = small.astype(object) * scale
+    results = []
+    for backend, inits in (('int64', small), ('object', large), ('python', large)):
+        start = time.perf_counter()
+        times, _ = core.max_minus_min_batch(inits, backend=backend)
+        seconds = time.perf_counter() - start
+        steps = int(times.sum()) - 3 * n
+        results.append({'backend': backend, 'seconds': seconds,
+                        'inits_per_s': n / seconds, 'steps_per_s': steps / seconds})
+    return results
+
+
+##########################################################
+# Import time benchmark
+##########################################################
+
+# Modules that must import without loading any of GUI_MODULES
+COMPUTE_MODULES = ('core', 'sweep', 'cli', 'visualization', 'notebook_helpers')
+GUI_MODULES = ('matplotlib', 'tkinter', 'graphviz')
+
+
+def benchmark_imports(modules=COMPUTE_MODULES, repeat=5):
+    """Time importing each module in a fresh interpreter.
+
+    seconds is the best of repeat imports, less the startup time of an
+    interpreter that imports nothing.
+
+    Returns:
+        List of dicts with module, seconds and gui_modules, the GUI_MODULES
+        the import pulled in (which should be empty)
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def best_time(code):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, '-c', code], cwd=here, check=True,
+                                    capture_output=True, text=True).stdout
+            best = min(best, time.perf_counter() - start)
+        return best, output
+
+    startup, _ = best_time('pass')
+    results = []
+    for module in modules:
+        seconds, output = best_time(f'import sys, {module}; '
+                                    f'print(*[m for m in {GUI_MODULES!r} if m in sys.modules])')
+        results.append({'module': module, 'seconds': max(seconds - startup, 0.0),
+                        'gui_modules': output.split()})
+    return results
+
+
+##########################################################
+# Benchmark suite
+##########################################################
+
+# Each workload factory takes its size arguments and returns (run, unit):
+# run() does the measured work and returns how many units it processed.
+
+def _random_inits(n, max_val):
+    return np.random.default_rng(0).integers(0, max_val + 1, size=(n, 3))
+
+
+def _workload_max_minus_min_seq(n, max_val):
+    inits = _random_inits(n, max_val).tolist()
+
+    def run():
+        return sum(len(core.max_minus_min_seq(init)) - 3 for init in inits)
+    return run, 'steps'
+
+
+def _workload_generate_seqs(n, max_val):
+    inits = _random_inits(n, max_val)
+
+    def run():
+        return sum(len(seq) - 3 for seq in core.generate_seqs(inits))
+    return run, 'steps'
+
+
+def _workload_convergence_stats_many(n, max_val):
+    inits = _random_inits(n, max_val)
+
+    def run():
+        times, _ = core.convergence_stats_many(inits)
+        return int(times.sum()) - 3 * n
+    return run, 'steps'
+
+
+def _workload_sweep_As_Ds(size):
+    def run():
+        times, _ = sweep_As_Ds(range(size), range(size), workers=1)
+        return int(times.sum()) - 3 * times.size
+    return run, 'steps'
+
+
+def _workload_build_tree(end_val, n):
+    def run():
+        return core.build_tree([end_val] * 3, n).get_number_of_nodes()
+    return run, 'nodes'
+
+
+def _workload_get_all_paths(end_val, n):
+    tree = core.build_tree([end_val] * 3, n)
+
+    def run():
+        return len(core.get_all_paths(tree))
+    return run, 'paths'
+
+
+def _workload_label_all_paths(end_val, n):
+    paths = core.get_all_paths(core.build_tree([end_val] * 3, n))
+
+    def run():
+        return sum(len(path) for path in core.label_all_paths(paths))
+    return run, 'labels'
+
+
+def _workload_labeled_paths(end_val, n):
+    paths = core.get_all_paths(core.build_tree([end_val] * 3, n))
+
+    def run():
+        labels = core.LabeledPaths.from_paths(paths)
+        return labels.values.size
+    return run, 'labels'
+
+
+def _workload_primes(n):
+    def run():
+        core.clear_prime_cache()
+        return len(core.primes_array(n))
+    return run, 'primes'
+
+
+def _workload_prime_seed(n):
+    seed = core.primes_array(n)
+
+    def run():
+        times, _ = core.convergence_stats_many(core.inits_from_sequence_view(seed))
+        return len(times)
+    return run, 'windows'
+
+
+# name -> (factory, quick args, full args)
+WORKLOADS = {
+    'max_minus_min_seq/1e2': (_workload_max_minus_min_seq, (2000, 10**2), (20000, 10**2)),
+    'max_minus_min_seq/1e4': (_workload_max_minus_min_seq, (500, 10**4), (5000, 10**4)),
+    'generate_seqs/1e2': (_workload_generate_seqs, (20000, 10**2), (200000, 10**2)),
+    'generate_seqs/1e4': (_workload_generate_seqs, (5000, 10**4), (50000, 10**4)),
+    'convergence_stats_many/1e6': (_workload_convergence_stats_many, (5000, 10**6), (20000, 10**6)),
+    'sweep_As_Ds/100': (_workload_sweep_As_Ds, (100,), (100,)),
+    'sweep_As_Ds/300': (_workload_sweep_As_Ds, (300,), (300,)),
+    'sweep_As_Ds/1000': (_workload_sweep_As_Ds, None, (1000,)),
+    'build_tree/14': (_workload_build_tree, (12, 14), (12, 14)),
+    'build_tree/18': (_workload_build_tree, (12, 16), (12, 18)),
+    'get_all_paths/18': (_workload_get_all_paths, (12, 16), (12, 18)),
+    'label_all_paths/14': (_workload_label_all_paths, (12, 11), (12, 14)),
+    'labeled_paths/14': (_workload_labeled_paths, (12, 11), (12, 14)),
+    'primes/1e5': (_workload_primes, (10**5,), (10**5,)),
+    'primes/1e6': (_workload_primes, (10**6,), (10**6,)),
+    'primes/1e7': (_workload_primes, None, (10**7,)),
+    'prime_seed/1e3': (_workload_prime_seed, (10**3,), (10**3,)),
+    'prime_seed/1e4': (_workload_prime_seed, None, (10**4,)),
+    # Window convergence times grow with the primes, so the work is roughly
+    # quadratic in n: about 2 minutes per run at 1e5 and hours at 1e6
+    'prime_seed/1e5': (_workload_prime_seed, None, (10**5,)),
+}
+
+
+def run_benchmarks(quick=False, names=None, repeat=3):
+    """Run the benchmark workloads.
+
+    Time is the best of repeat runs. Peak memory comes from one extra run
+    under tracemalloc, kept apart so tracing does not distort the timings.
+
+    Args:
+        quick: Use the smaller quick sizes and skip full-only workloads
+        names: Workload names to run (None for all)
+        repeat: Number of timed runs per workload
+
+    Returns:
+        Dict name -> {seconds, peak_mb, units, unit, throughput}
+    """
+    results = {}
+    for name, (factory, quick_args, full_args) in WORKLOADS.items():
+        args = quick_args if quick else full_args
+        if args is None or (names is not None and name not in names):
+            continue
+        run, unit = factory(*args)
+        seconds = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            units = run()
+            seconds = min(seconds, time.perf_counter() - start)
+        tracemalloc.start()
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = {'seconds': seconds, 'peak_mb': peak / 2**20, 'units': units,
+                         'unit': unit, 'throughput': units / seconds if seconds > 0 else float('inf')}
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance=0.25):
+    """Workloads more than tolerance (as a fraction) slower than baseline.
+
+    Returns:
+        List of (name, seconds, baseline_seconds) for each regression
+    """
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result['seconds'] > baseline[name]['seconds'] * (1 + tolerance):
+            regressions.append((name, result['seconds'], baseline[name]['seconds']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark MMM sequence computations.')
+    parser.add_argument('--quick', action='store_true', help='use the small workload sizes')
+    parser.add_argument('--only', nargs='+', metavar='NAME', help='run only these workloads')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per workload')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results to compare against; slower runs fail')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown relative to the baseline (default 0.25)')
+    parser.add_argument('--parallel', action='store_true', help='also run the parallel sweep benchmark')
+    parser.add_argument('--backends', action='store_true', help='also run the numeric backend benchmark')
+    parser.add_argument('--imports', action='store_true',
+                        help='also time module imports; fails if one loads a GUI module')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(quick=args.quick, names=args.only, repeat=args.repeat)
+    for name, r in results.items():
+        print(f"{name:<28} {r['seconds']:9.4f}s  {r['peak_mb']:9.1f} MB  "
+              f"{r['throughput']:14.0f} {r['unit']}/s")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.parallel:
+        for row in benchmark_parallel_sweep():
+            print(f"workers={row['workers']:>3}  {row['seconds']:8.3f}s  speedup={row['speedup']:.2f}x")
+    if args.backends:
+        for row in benchmark_backends():
+            print(f"backend={row['backend']:>6}  {row['seconds']:8.3f}s  "
+                  f"{row['inits_per_s']:12.0f} inits/s  {row['steps_per_s']:12.0f} steps/s")
+
+    status = 0
+    if args.imports:
+        for row in benchmark_imports():
+            print(f"import {row['module']:<18} {row['seconds']:8.3f}s  {' '.join(row['gui_modules'])}")
+            if row['gui_modules']:
+                print(f"IMPORT REGRESSION {row['module']} loads {', '.join(row['gui_modules'])}")
+                status = 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for name, seconds, base in regressions:
+            print(f'REGRESSION {name}: {seconds:.4f}s vs baseline {base:.4f}s')
+        if regressions:
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import core
+
+# Standalone equivalence checks: each fast path is compared element by element
+# against the plain Python code it replaces. Run with python checks.py.
+
+
+class CheckFailed(AssertionError):
+    pass
+
+
+def _expect(condition, message):
+    if not condition:
+        raise CheckFailed(message)
+
+
+##########################################################
+# Batch engine
+##########################################################
+
+def _check_inits(seed=0):
+    """Inits covering zeros, ties, equal terms, common factors and negatives"""
+    rng = np.random.default_rng(seed)
+    grid = np.array(np.meshgrid(range(8), range(8), range(8), indexing='ij')).reshape(3, -1).T
+    return np.concatenate([
+        grid,
+        rng.integers(0, 100, (2000, 3)),
+        rng.integers(0, 10**6, (1000, 3)),
+        rng.integers(1, 50, (500, 1)) * np.array([[2, 4, 6]]),
+        rng.integers(-20, 20, (500, 3)),
+    ])
+
+
+def check_batch_engine(seed=0):
+    """max_minus_min_batch on every backend against max_minus_min_seq per init.
+
+    Returns:
+        Number of inits checked
+    """
+    inits = _check_inits(seed)
+    seqs = [core.max_minus_min_seq(init) for init in inits.tolist()]
+    expected_times = [len(seq) for seq in seqs]
+    expected_values = [seq[-2] for seq in seqs]
+
+    for backend in ('auto', 'int64', 'object', 'python'):
+        times, values, batch_seqs = core.max_minus_min_batch(inits, return_seqs=True, backend=backend)
+        _expect(times.tolist() == expected_times, f'{backend}: times differ from max_minus_min_seq')
+        _expect(values.tolist() == expected_values, f'{backend}: values differ from max_minus_min_seq')
+        _expect([list(seq) for seq in batch_seqs] == seqs, f'{backend}: sequences differ from max_minus_min_seq')
+        times, values = core.max_minus_min_batch(inits, backend=backend)
+        _expect(times.tolist() == expected_times and values.tolist() == expected_values,
+                f'{backend}: return_seqs=False gives different stats')
+
+    # Python ints past int64 go through the object path. Small offsets on
+    # huge terms take about as many steps as subtractive Euclid, so small
+    # inits are scaled up instead
+    big = [[a * 10**20, b * 10**20, c * 10**20] for a, b, c in inits[:300].tolist()]
+    big_seqs = [core.max_minus_min_seq(init) for init in big]
+    times, values, batch_seqs = core.max_minus_min_batch(big, return_seqs=True)
+    _expect([list(seq) for seq in batch_seqs] == big_seqs, 'big ints: sequences differ from max_minus_min_seq')
+    _expect(values.tolist() == [seq[-2] for seq in big_seqs], 'big ints: values differ from max_minus_min_seq')
+
+    for cache in (None, core.ConvergenceCache(), core.ConvergenceCache(maxsize=64)):
+        for _ in range(2):
+            times, values = core.convergence_stats_many(inits, cache=cache)
+            _expect(times.tolist() == expected_times and values.tolist() == expected_values,
+                    f'convergence_stats_many(cache={cache!r}) differs from max_minus_min_seq')
+    return len(inits) + len(big)
+
+
+##########################################################
+# Path labeling
+##########################################################
+
+def _label_fields(item):
+    if item is None:
+        return None
+    signature = item.signature
+    return (item.value, signature.at_0, signature.at_1, signature.at_2,
+            item.is_ignored, item.is_shifting_point, item.backwards_point_type)
+
+
+def _crafted_paths(width=7):
+    """Every sequence over {0, 1, 2} of length 1 to width, which includes
+    all-equal windows and every kind of tie, plus all-equal runs of other
+    values, each padded with leading None to width"""
+    digits = np.arange(3)
+    for length in range(1, width + 1):
+        grid = np.array(np.meshgrid(*[digits] * length, indexing='ij')).reshape(length, -1).T
+        for seq in grid.tolist():
+            yield [None] * (width - length) + seq
+        for value in (0, 5, 12):
+            yield [None] * (width - length) + [value] * length
+
+
+def check_labeling():
+    """label_paths_array, through LabeledPaths, against label_sequence path by path.
+
+    Returns:
+        Number of labeled values checked
+    """
+    groups = [list(_crafted_paths())]
+    for end, n, negatives in (((12, 12, 12), 9, False), ((3, 5, 8), 10, False),
+                              ((7, 7, 0), 8, False), ((5, 3, 8), 7, True)):
+        groups.append(list(core.iter_paths(core.build_tree(end, n, negatives=negatives))))
+    # Values past int64, which paths_to_array keeps as an object array
+    groups.append(list(core.iter_paths(core.build_tree((10**20, 10**20, 10**20), 2))))
+    groups.append([[None if v is None else v * 10**20 + 1 for v in path] for path in groups[1]])
+    # Whole forward sequences, one per group since their lengths differ
+    for init in np.random.default_rng(0).integers(0, 50, (200, 3)).tolist():
+        groups.append([core.max_minus_min_seq(init)])
+
+    checked = 0
+    for paths in groups:
+        labels = core.LabeledPaths.from_paths(paths)
+        for path, view in zip(paths, labels):
+            expected = [_label_fields(item) for item in core.label_sequence(list(path))]
+            _expect([_label_fields(item) for item in view] == expected,
+                    f'labels of {list(path)} differ from label_sequence')
+            checked += len(path) - list(path).count(None)
+    return checked
+
+
+##########################################################
+# Inverse search
+##########################################################
+
+def check_find_inits():
+    """find_inits against a forward sweep over every init in small boxes.
+
+    Every (time, value) pair reached from the box, plus pairs next to them
+    that may not be, is searched; the result has to be exactly the inits
+    the sweep found for it, so pruning may not drop any.
+
+    Returns:
+        Number of (box, time, value) searches checked
+    """
+    checked = 0
+    for box, negatives in ((((0, 14), (0, 14), (0, 14)), False),
+                           (((3, 40), (0, 9), (5, 25)), False),
+                           (((-6, 8), (-6, 8), (-6, 8)), True),
+                           (((-6, 8), (-6, 8), (-6, 8)), False)):
+        lows = [lo if negatives else max(lo, 0) for lo, _ in box]
+        axes = [np.arange(lo, hi + 1) for lo, (_, hi) in zip(lows, box)]
+        inits = np.array(np.meshgrid(*axes, indexing='ij')).reshape(3, -1).T
+        times, values = core.max_minus_min_batch(inits)
+
+        found = {}
+        for init, t, v in zip(inits.tolist(), times.tolist(), values.tolist()):
+            found.setdefault((t, v), []).append(init)
+        targets = set(found)
+        targets |= {(t + dt, v + dv) for t, v in found for dt in (-1, 1) for dv in (-1, 1)}
+        for t, v in sorted(targets):
+            result = core.find_inits(v, t, box, negatives=negatives)
+            _expect(result.tolist() == sorted(found.get((t, v), [])),
+                    f'find_inits({v}, {t}, {box}, negatives={negatives}) differs from the sweep')
+            checked += 1
+    return checked
+
+
+##########################################################
+# Running the checks
+##########################################################
+
+# name -> check function returning the number of cases it compared
+CHECKS = {
+    'batch_engine': check_batch_engine,
+    'labeling': check_labeling,
+    'find_inits': check_find_inits,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the fast paths against the reference implementations.')
+    parser.add_argument('--only', nargs='+', metavar='NAME', choices=list(CHECKS), help='run only these checks')
+    args = parser.parse_args(argv)
+
+    status = 0
+    for name in args.only or CHECKS:
+        start = time.perf_counter()
+        try:
+            cases = CHECKS[name]()
+        except CheckFailed as e:
+            print(f'{name:<20} FAILED: {e}')
+            status = 1
+            continue
+        print(f'{name:<20} ok  {cases:>8} cases  {time.perf_counter() - start:7.2f}s')
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
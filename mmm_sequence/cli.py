@@ -0,0 +1,259 @@
+import argparse
+import contextlib
+import csv
+import os
+import sys
+
+# Only argparse is imported up front so --help is instant; each command
+# imports what it needs from core and sweep. tree -o also uses
+# visualization, which loads graphviz only to render an SVG.
+
+
+##########################################################
+# Output
+##########################################################
+
+def _write_columns(path, columns):
+    """Write equal-length columns to path as .npz, or as CSV (stdout for None or '-').
+
+    Arrays of Python ints too large for int64 are stored in .npz files as
+    strings, so they load without pickling.
+    """
+    import numpy as np
+
+    if path is not None and path.endswith('.npz'):
+        arrays = {}
+        for name, column in columns.items():
+            column = np.asarray(column)
+            arrays[name] = column.astype(str) if column.dtype == object else column
+        np.savez_compressed(path, **arrays)
+        return
+
+    with _csv_writer(path) as writer:
+        writer.writerow(columns)
+        writer.writerows(zip(*(np.asarray(column).tolist() for column in columns.values())))
+
+
+def _write_grid(path, As, Ds, times, values):
+    """Write (len(As), len(Ds)) times and values grids to path.
+
+    A .npz file holds the a and d axes and the time and value grids as they
+    are. CSV gets one row per (a, d), written one a at a time, so memory-mapped
+    grids are streamed rather than read in whole.
+    """
+    import numpy as np
+
+    if path is not None and path.endswith('.npz'):
+        grids = {'time': times, 'value': values}
+        for name, grid in grids.items():
+            if grid.dtype == object:
+                grids[name] = grid.astype(str)
+        np.savez_compressed(path, a=np.asarray(As), d=np.asarray(Ds), **grids)
+        return
+
+    Ds = list(Ds)
+    with _csv_writer(path) as writer:
+        writer.writerow(['a', 'd', 'time', 'value'])
+        for i, a in enumerate(As):
+            writer.writerows(zip([a] * len(Ds), Ds, times[i].tolist(), values[i].tolist()))
+
+
+@contextlib.contextmanager
+def _csv_writer(path):
+    """csv.writer on path, or on stdout for None or '-'"""
+    if path in (None, '-'):
+        yield csv.writer(sys.stdout)
+        return
+    with open(path, 'w', newline='') as f:
+        yield csv.writer(f)
+
+
+##########################################################
+# Commands
+##########################################################
+
+def cmd_sweep3d(args):
+    from sweep import run_sweep_job, sweep_As_Ds
+
+    As = range(args.min_a, args.max_a + 1)
+    Ds = range(args.min_d, args.max_d + 1)
+    if args.store is not None:
+        # The store covers exactly this range, so its memory-mapped grids are
+        # written out directly instead of being copied by read_window
+        store = run_sweep_job(args.store, args.min_a, args.max_a, args.min_d, args.max_d,
+                              tile_size=args.tile_size, workers=args.workers)
+        times, values = store.times, store.values
+    else:
+        times, values = sweep_As_Ds(As, Ds, workers=args.workers, chunk_size=args.chunk_size)
+    _write_grid(args.output, As, Ds, times, values)
+
+
+def cmd_sweep2d(args):
+    from sweep import sweep_As_Ds
+
+    varying = list(range(args.min, args.max + 1))
+    if args.vary == 'a':
+        times, values = sweep_As_Ds(varying, [args.fixed], workers=args.workers, chunk_size=args.chunk_size)
+    else:
+        times, values = sweep_As_Ds([args.fixed], varying, workers=args.workers, chunk_size=args.chunk_size)
+    _write_columns(args.output, {args.vary: varying, 'time': times.ravel(), 'value': values.ravel()})
+
+
+def _parse_params(params):
+    """NAME=INT pairs from --param into keyword arguments"""
+    kwargs = {}
+    for param in params:
+        name, sep, value = param.partition('=')
+        if not sep:
+            raise SystemExit(f'--param expects NAME=VALUE, got {param!r}')
+        kwargs[name] = int(value)
+    return kwargs
+
+
+def cmd_seed(args):
+    import numpy as np
+    from core import SEED_FUNCTIONS, convergence_stats_many, inits_from_sequence_view
+
+    if args.seq_func not in SEED_FUNCTIONS:
+        raise SystemExit(f'Invalid sequence function: {args.seq_func}')
+    seed = SEED_FUNCTIONS[args.seq_func](args.n, **_parse_params(args.param))
+    times, values = convergence_stats_many(inits_from_sequence_view(seed))
+    _write_columns(args.output, {'index': np.arange(len(times)), 'time': times, 'value': values})
+
+
+def cmd_tree(args):
+    from core import backwards_tree_stats, build_tree
+
+    if args.output is None:
+        stats = backwards_tree_stats(args.end, args.n, negatives=args.negatives)
+        print(f'nodes {stats.nodes}')
+        print(f'leaves {stats.leaves}')
+        print(f'level_nodes {" ".join(map(str, stats.level_nodes))}')
+        return
+
+    from visualization import render_dot, write_dot
+
+    root = build_tree(args.end, args.n, negatives=args.negatives)
+    if args.output.endswith('.svg'):
+        dot_path = write_dot(root, args.output[:-len('.svg')] + '.gv', args.max_depth, args.max_children)
+        try:
+            print(render_dot(dot_path))
+        finally:
+            os.remove(dot_path)
+    else:
+        print(write_dot(root, args.output, args.max_depth, args.max_children))
+
+
+def cmd_labels(args):
+    import numpy as np
+    from core import (BACKWARDS_POINT_TYPES, IGNORED_FLAG, SHIFTING_FLAG, SIGNATURE_TYPES, build_tree,
+                      iter_labeled_path_chunks, iter_paths)
+
+    tree = build_tree(args.end, args.n, negatives=args.negatives)
+    chunks = iter_labeled_path_chunks(iter_paths(tree))
+    # Mirrors LabeledPaths: signatures packed two bits per position into one
+    # byte, flags 1 = ignored and 2 = shifting point, point types as codes
+    if args.output is not None and args.output.endswith('.npz'):
+        columns = {name: [] for name in ('values', 'mask', 'signatures', 'flags', 'point_types')}
+        for chunk in chunks:
+            for name, arrays in columns.items():
+                arrays.append(getattr(chunk, name))
+        np.savez_compressed(args.output, **{name: np.concatenate(arrays) for name, arrays in columns.items()})
+        return
+
+    # One CSV row per labeled value, as print_labeled_backwards_tree shows
+    # them, written a chunk at a time straight from the code arrays
+    signature_names = np.array([' '.join(SIGNATURE_TYPES[code >> shift & 3].value for shift in (0, 2, 4))
+                                for code in range(64)], dtype=object)
+    point_type_names = np.array([t.value for t in BACKWARDS_POINT_TYPES], dtype=object)
+    with _csv_writer(args.output) as writer:
+        writer.writerow(['path', 'position', 'value', 'signature', 'ignored', 'shifting', 'point_type'])
+        first_path = 0
+        for chunk in chunks:
+            rows, positions = np.nonzero(~chunk.mask)
+            flags = chunk.flags[rows, positions]
+            writer.writerows(zip((rows + first_path).tolist(), positions.tolist(),
+                                 chunk.values[rows, positions].tolist(),
+                                 signature_names[chunk.signatures[rows, positions]].tolist(),
+                                 (flags & IGNORED_FLAG != 0).astype(int).tolist(),
+                                 (flags & SHIFTING_FLAG != 0).astype(int).tolist(),
+                                 point_type_names[chunk.point_types[rows, positions]].tolist()))
+            first_path += len(chunk)
+
+
+##########################################################
+# Argument parsing
+##########################################################
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m mmm_sequence',
+        description='Headless MMM sequence computations. Results go to OUTPUT as .npz '
+                    'or CSV (default: CSV on stdout).')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_output(sub):
+        sub.add_argument('-o', '--output', help='.npz or .csv file (default: CSV on stdout)')
+
+    def add_workers(sub):
+        sub.add_argument('--workers', type=int, default=1,
+                         help='worker processes (0 for all cores, default 1)')
+        sub.add_argument('--chunk-size', type=int, default=65536, help='inits per parallel tile')
+
+    sweep3d = commands.add_parser('sweep3d', help='convergence over the (a, d) grid, as plot_convergence_3d')
+    for name in ('min-a', 'max-a', 'min-d', 'max-d'):
+        sweep3d.add_argument(f'--{name}', type=int, required=True)
+    add_workers(sweep3d)
+    sweep3d.add_argument('--store', help='resumable SweepStore directory to compute into first')
+    sweep3d.add_argument('--tile-size', type=int, default=256, help='SweepStore tile side length')
+    add_output(sweep3d)
+    sweep3d.set_defaults(func=cmd_sweep3d)
+
+    sweep2d = commands.add_parser('sweep2d', help='convergence varying a or d, as plot_convergence_2d')
+    sweep2d.add_argument('--vary', choices=('a', 'd'), default='a')
+    sweep2d.add_argument('--min', type=int, required=True, help='smallest value of the varying parameter')
+    sweep2d.add_argument('--max', type=int, required=True, help='largest value of the varying parameter')
+    sweep2d.add_argument('--fixed', type=int, required=True, help='value of the fixed parameter')
+    add_workers(sweep2d)
+    add_output(sweep2d)
+    sweep2d.set_defaults(func=cmd_sweep2d)
+
+    seed = commands.add_parser('seed', help='convergence over windows of a seed sequence, as analyze_seed_sequence')
+    seed.add_argument('seq_func', help='seed function name, e.g. primes')
+    seed.add_argument('-n', type=int, default=100, help='length of the seed sequence')
+    seed.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                      help='extra integer argument of the seed function, e.g. j=3')
+    add_output(seed)
+    seed.set_defaults(func=cmd_seed)
+
+    for name, func, help_text in (
+            ('tree', cmd_tree, 'backwards tree: stats, or DOT/SVG with -o, as visualize_backwards_tree'),
+            ('labels', cmd_labels, 'labeled backwards tree paths, as print_labeled_backwards_tree')):
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument('end', type=int, nargs=3, help='last three terms of the sequence')
+        sub.add_argument('-n', type=int, default=5, help='number of backward steps')
+        sub.add_argument('--negatives', action='store_true', help='include steps into negative numbers')
+        sub.set_defaults(func=func)
+        if name == 'tree':
+            sub.add_argument('--max-depth', type=int, help='collapse nodes deeper than this')
+            sub.add_argument('--max-children', type=int, help='collapse children past this many')
+            sub.add_argument('-o', '--output', help='.gv/.dot file to write, or .svg to render')
+        else:
+            add_output(sub)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, 'workers', None) == 0:
+        args.workers = None
+    try:
+        args.func(args)
+    except BrokenPipeError:
+        # Output piped into e.g. head, which stopped reading
+        sys.stderr.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
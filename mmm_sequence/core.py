@@ -1,8 +1,15 @@
+import math
+import os
 import random
+import sqlite3
 import numpy as np
+from collections import OrderedDict, namedtuple
 from enum import Enum
 from typing import List, Tuple
 
+import instrumentation
+from instrumentation import phase
+
 ##########################################################
 # Max Minus Min Sequence
 ##########################################################
@@ -28,9 +35,604 @@ def max_minus_min_seq(init, max_points=None):
             mn = min([prev1, prev2, prev3])
             new_term = mx - mn
             seq.append(new_term)
+    if instrumentation.enabled:
+        instrumentation.count('steps', len(seq) - len(init))
     return seq
 
 
+##########################################################
+# Convergence cache
+##########################################################
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+def primitive_triple(triple):
+    """Split a triple into (triple // g, g) where g is the gcd of its entries.
+
+    Since k*S is an MMM sequence whenever S is, a triple converges in the same
+    time as its primitive triple, to g times the primitive convergence value.
+    """
+    x, y, z = triple
+    g = math.gcd(x, y, z)
+    if g <= 1:
+        return (x, y, z), 1
+    return (x // g, y // g, z // g), g
+
+
+class ConvergenceCache:
+    """Bounded LRU cache of (time, value) keyed on primitive triples.
+
+    The time stored for a triple is len(max_minus_min_seq(triple)), so a
+    triple reached k steps into a sequence of length T has time T - k.
+    Only triples whose last entry is positive are worth storing.
+    """
+
+    def __init__(self, maxsize=2**18):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, triple):
+        """Return (time, value) for triple, or None if it is not cached"""
+        key, g = primitive_triple(triple)
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        return entry[0], entry[1] * g
+
+    def put(self, triple, time, value):
+        key, g = primitive_triple(triple)
+        self._store(key, time, value // g)
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._entries))
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._load(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._store(key, *entry)
+        else:
+            self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def _store(self, key, time, value):
+        self._entries[key] = (time, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            old_key, old_entry = self._entries.popitem(last=False)
+            self.evictions += 1
+            self._evict(old_key, old_entry)
+
+    def _load(self, key):
+        """Fallback lookup for keys not held in memory"""
+        return None
+
+    def _evict(self, key, entry):
+        """Called with each entry dropped from memory"""
+
+
+convergence_cache = ConvergenceCache()
+
+
+def convergence_stats(init, cache=None):
+    """Convergence time and value of max_minus_min_seq(init).
+
+    With the default cache=None this runs in O(1) memory. Given a
+    ConvergenceCache (such as convergence_cache), every triple visited along
+    the way is looked up in and then added to cache, so later inits that
+    reach a known triple stop there; the walk then keeps its O(T) path.
+
+    Returns:
+        (len(seq), seq[-2]) without building seq
+    """
+    a, b, c = init[-3], init[-2], init[-1]
+    time = len(init)
+    if cache is None or not isinstance(c, (int, np.integer)):
+        while c > 0:
+            a, b, c = b, c, max(a, b, c) - min(a, b, c)
+            time += 1
+        if instrumentation.enabled:
+            instrumentation.count('steps', time - len(init))
+        return time, b
+
+    path = []
+    value = None
+    while c > 0:
+        hit = cache.get((a, b, c))
+        if hit is not None:
+            time += hit[0] - 3
+            value = hit[1]
+            break
+        path.append((a, b, c))
+        a, b, c = b, c, max(a, b, c) - min(a, b, c)
+        time += 1
+    if value is None:
+        value = b
+
+    remaining = time - len(init) + 3
+    for k, triple in enumerate(path):
+        cache.put(triple, remaining - k, value)
+    if instrumentation.enabled:
+        instrumentation.count('steps', len(path))
+    return time, value
+
+
+##########################################################
+# Convergence graph
+##########################################################
+
+class ConvergenceGraph(ConvergenceCache):
+    """Convergence solver that shares trajectory tails between inits.
+
+    Every window triple visited is recorded with its remaining sequence length
+    and final value, so each new init is only walked until it reaches a state
+    some earlier init already visited. Total work then scales with the number
+    of distinct (primitive) states rather than the sum of sequence lengths.
+
+    At most max_states states are kept in memory. Least recently used states
+    are dropped, or written to an SQLite file when spill_path is given and
+    read back from it on demand.
+    """
+
+    def __init__(self, max_states=2**20, spill_path=None, spill_batch=10000):
+        super().__init__(maxsize=max_states)
+        self.spill_path = spill_path
+        self.spill_batch = spill_batch
+        self.states_walked = 0
+        self.spilled = 0
+        self._pending = {}
+        self._db = None
+        if spill_path is not None:
+            self._db = sqlite3.connect(spill_path)
+            self._db.execute('CREATE TABLE IF NOT EXISTS states '
+                             '(triple TEXT PRIMARY KEY, time INTEGER, value TEXT) WITHOUT ROWID')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def put(self, triple, time, value):
+        self.states_walked += 1
+        super().put(triple, time, value)
+
+    def solve(self, init):
+        """Same result as convergence_stats(init)"""
+        return convergence_stats(init, cache=self)
+
+    def solve_many(self, inits):
+        """Same result as convergence_stats_many(inits)"""
+        results = [convergence_stats(init, cache=self) for init in inits]
+        times = np.array([t for t, _ in results], dtype=np.int64)
+        values = np.array([v for _, v in results])
+        return times, values
+
+    def flush(self):
+        if self._db is not None and self._pending:
+            self._db.executemany('INSERT OR REPLACE INTO states VALUES (?, ?, ?)',
+                                 [(k, t, v) for k, (t, v) in self._pending.items()])
+            self._db.commit()
+            self._pending.clear()
+
+    def close(self):
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+    def _load(self, key):
+        if self._db is None:
+            return None
+        spill_key = '%d,%d,%d' % key
+        if spill_key in self._pending:
+            time, value = self._pending[spill_key]
+        else:
+            row = self._db.execute('SELECT time, value FROM states WHERE triple = ?',
+                                   (spill_key,)).fetchone()
+            if row is None:
+                return None
+            time, value = row
+        return time, int(value)
+
+    def _evict(self, key, entry):
+        if self._db is None:
+            return
+        self._pending['%d,%d,%d' % key] = (entry[0], str(entry[1]))
+        self.spilled += 1
+        if len(self._pending) >= self.spill_batch:
+            self.flush()
+
+
+##########################################################
+# Batch engine
+##########################################################
+
+# Terms never exceed 2 * max(|init|), so inits below this bound can be
+# stepped in int64 without overflow.
+INT64_SAFE_BOUND = 2**62
+
+# Every integer below this bound is exactly representable as a float64
+FLOAT64_EXACT_BOUND = 2**53
+
+# Backends accepted by the batch functions, fastest first: int64 arrays,
+# object arrays of Python ints, and a plain per-init Python loop
+NUMERIC_BACKENDS = ('auto', 'int64', 'object', 'python')
+
+
+def _init_array(inits, backend='auto'):
+    """Convert inits to an (N, 3) array for the given numeric backend.
+
+    With backend='auto', integer inits become int64 when every value is below
+    INT64_SAFE_BOUND and an object array of Python ints otherwise, and float
+    inits stay float64. 'object' and 'python' always give an object array.
+
+    Raises:
+        OverflowError: backend='int64' but the inits could overflow int64, or
+            float inits too large to be exact
+        ValueError: float inits that are not finite, or not whole numbers
+            when an integer backend is requested
+    """
+    if backend not in NUMERIC_BACKENDS:
+        raise ValueError(f'Invalid backend: {backend}, expected one of {NUMERIC_BACKENDS}')
+    if isinstance(inits, np.ndarray) and inits.dtype.kind != 'O':
+        arr = inits
+    else:
+        arr = np.array(inits, dtype=object)
+    if arr.size == 0:
+        return np.zeros((0, 3), dtype=np.int64 if backend in ('auto', 'int64') else object)
+    if arr.ndim != 2 or arr.shape[1] != 3:
+        raise ValueError(f'inits must have shape (N, 3), got {arr.shape}')
+    if arr.dtype.kind not in 'iubfO':
+        raise TypeError(f'Unsupported init dtype: {arr.dtype}')
+
+    if arr.dtype.kind == 'O' and not all(isinstance(v, (int, np.integer)) for v in arr.flat):
+        arr = arr.astype(np.float64)
+    if arr.dtype.kind == 'f':
+        if not np.isfinite(arr).all():
+            raise ValueError('inits contain NaN or infinity')
+        if np.abs(arr).max() >= FLOAT64_EXACT_BOUND:
+            raise OverflowError('Float inits of magnitude 2**53 or more are not exact; pass Python ints instead')
+        if backend == 'auto':
+            return arr
+        if not (arr == np.round(arr)).all():
+            raise ValueError(f'Backend {backend} needs whole-number inits')
+        arr = arr.astype(np.int64)
+
+    if arr.dtype.kind == 'O':
+        too_large = max(abs(int(v)) for v in arr.flat) >= INT64_SAFE_BOUND
+    else:
+        too_large = int(arr.max()) >= INT64_SAFE_BOUND or int(arr.min()) <= -INT64_SAFE_BOUND
+
+    if backend == 'int64' and too_large:
+        raise OverflowError(f'Inits reach {INT64_SAFE_BOUND} in magnitude and could overflow int64; '
+                            f"use backend='object' or 'auto'")
+    if backend in ('auto', 'int64') and not too_large:
+        return arr.astype(np.int64, copy=False)
+    if arr.dtype.kind == 'O':
+        return np.vectorize(int, otypes=[object])(arr)
+    return np.array(arr.tolist(), dtype=object)
+
+
+def numeric_backend(inits):
+    """Backend 'auto' would step inits with: 'int64', 'object' or 'float64'"""
+    arr = _init_array(inits)
+    return 'object' if arr.dtype.kind == 'O' else arr.dtype.name
+
+
+def _python_batch(arr, return_seqs):
+    """max_minus_min_batch computed one init at a time on Python ints"""
+    inits = arr.tolist()
+    if return_seqs:
+        seqs = [max_minus_min_seq(init) for init in inits]
+        stats = [(len(seq), seq[-2]) for seq in seqs]
+    else:
+        stats = [convergence_stats(init, cache=None) for init in inits]
+    times = np.array([t for t, _ in stats], dtype=np.int64)
+    values = np.empty(len(stats), dtype=object)
+    values[:] = [v for _, v in stats]
+    if return_seqs:
+        return times, values, seqs
+    return times, values
+
+
+def max_minus_min_batch(inits, return_seqs=False, backend='auto'):
+    """Run max_minus_min_seq to convergence for many inits at once.
+
+    All rows are stepped together with NumPy; rows whose newest term has
+    reached 0 are dropped from the working set.
+
+    Args:
+        inits: (N, 3) array or list of 3-element inits
+        return_seqs: If True, also return the full sequences
+        backend: One of NUMERIC_BACKENDS. 'auto' uses int64 when that cannot
+            overflow and object arrays of Python ints otherwise; see _init_array
+
+    Returns:
+        (times, values) as length-N arrays, where times[i] == len(seq) and
+        values[i] == seq[-2] for seq = max_minus_min_seq(inits[i]).
+        With return_seqs, (times, values, seqs) where seqs is a list of lists.
+    """
+    arr = _init_array(inits, backend)
+    if backend == 'python':
+        return _python_batch(arr, return_seqs)
+    times, values, history = _step_batch(arr, return_seqs)
+    if not return_seqs:
+        return times, values
+
+    offsets, flat = _pack_history(arr, times, history)
+    flat = flat.tolist()
+    bounds = offsets.tolist()
+    seqs = [flat[bounds[i]:bounds[i + 1]] for i in range(len(arr))]
+    return times, values, seqs
+
+
+def _step_batch(arr, record):
+    """Step every row of an (N, 3) init array to convergence.
+
+    Returns:
+        (times, values, history) where history, if record is set, lists
+        (row indices, new terms) for each step
+    """
+    n = arr.shape[0]
+    times = np.full(n, 3, dtype=np.int64)
+    values = arr[:, 1].copy()
+
+    idx = np.flatnonzero(arr[:, 2] > 0)
+    a, b, c = arr[idx, 0], arr[idx, 1], arr[idx, 2]
+    history = []
+    while idx.size:
+        new = np.maximum(np.maximum(a, b), c) - np.minimum(np.minimum(a, b), c)
+        times[idx] += 1
+        if record:
+            history.append((idx, new))
+        done = new <= 0
+        if done.any():
+            values[idx[done]] = c[done]
+            keep = ~done
+            idx, a, b, c = idx[keep], b[keep], c[keep], new[keep]
+        else:
+            a, b, c = b, c, new
+    if instrumentation.enabled:
+        instrumentation.count('steps', int(times.sum()) - 3 * n)
+    return times, values, history
+
+
+def _pack_history(arr, times, history):
+    """Lay the sequences recorded by _step_batch out back to back.
+
+    Returns:
+        (offsets, flat) with sequence i in flat[offsets[i]:offsets[i + 1]]
+    """
+    offsets = np.zeros(len(arr) + 1, dtype=np.int64)
+    np.cumsum(times, out=offsets[1:])
+    flat = np.empty(offsets[-1], dtype=arr.dtype)
+    for k in range(3):
+        flat[offsets[:-1] + k] = arr[:, k]
+    for k, (step_idx, new) in enumerate(history):
+        flat[offsets[step_idx] + 3 + k] = new
+    return offsets, flat
+
+
+def convergence_stats_many(inits, cache=None, backend='auto'):
+    """Convergence times and values for many inits without building sequences.
+
+    With the default cache=None this is max_minus_min_batch. Given a
+    ConvergenceCache (such as convergence_cache), inits are reduced to
+    primitive triples and deduplicated; triples found in cache are answered
+    from it and the rest go through max_minus_min_batch and are added to
+    cache. That only pays off when later calls repeat earlier inits.
+
+    inits may also be any input accepted by iter_init_chunks, such as the
+    generators from chunk_inits_As_Ds; it is then processed chunk by chunk.
+    backend is as for max_minus_min_batch.
+
+    Returns:
+        (times, values) as length-N arrays
+    """
+    if _is_chunked(inits):
+        results = [convergence_stats_many(chunk, cache, backend) for chunk in iter_init_chunks(inits)]
+        if not results:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        return (np.concatenate([t for t, _ in results]),
+                np.concatenate([v for _, v in results]))
+
+    with phase('convergence'):
+        return _convergence_stats_many(inits, cache, backend)
+
+
+def _convergence_stats_many(inits, cache, backend):
+    """convergence_stats_many for a single array of inits"""
+    arr = _init_array(inits, backend)
+    if cache is None or backend == 'python' or arr.dtype.kind == 'f' or len(arr) == 0:
+        return max_minus_min_batch(arr, backend=backend)
+
+    g = np.gcd.reduce(arr, axis=1)
+    g[g == 0] = 1
+    prim = arr // g[:, None]
+    if arr.dtype == np.int64:
+        uniq, inverse = np.unique(prim, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        keys = [tuple(row) for row in uniq.tolist()]
+    else:
+        positions = {}
+        inverse = np.array([positions.setdefault(tuple(row), len(positions))
+                            for row in prim.tolist()], dtype=np.int64)
+        keys = list(positions)
+        uniq = np.empty((len(keys), 3), dtype=object)
+        uniq[:] = keys
+
+    times_u = np.empty(len(keys), dtype=np.int64)
+    values_u = np.empty(len(keys), dtype=arr.dtype)
+    missing = []
+    for i, key in enumerate(keys):
+        entry = cache._lookup(key) if key[2] > 0 else None
+        if entry is None:
+            missing.append(i)
+        else:
+            times_u[i], values_u[i] = entry
+
+    if missing:
+        times_m, values_m = max_minus_min_batch(uniq[missing], backend=backend)
+        times_u[missing] = times_m
+        values_u[missing] = values_m
+        for i, t, v in zip(missing, times_m.tolist(), values_m.tolist()):
+            if keys[i][2] > 0:
+                cache._store(keys[i], t, v)
+
+    return times_u[inverse], values_u[inverse] * g
+
+
+##########################################################
+# Sequence batches
+##########################################################
+
+class SequenceBatch:
+    """Many MMM sequences stored back to back in one flat values array.
+
+    Sequence i is values[offsets[i]:offsets[i + 1]]; indexing returns that
+    slice as a zero-copy view. values is int64 unless the inits needed
+    Python ints (see _init_array), in which case it is an object array.
+    Unlike a list of lists this costs 8 bytes per term, and convergence
+    times and values are read off the offsets without touching the terms.
+    """
+
+    def __init__(self, values, offsets):
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def from_inits(cls, inits, backend='auto'):
+        """Run every init to convergence, as generate_seqs does.
+
+        inits is anything convergence_stats_many accepts, including chunked
+        inits, which are stepped one chunk at a time.
+        """
+        if _is_chunked(inits):
+            return cls.concatenate([cls.from_inits(chunk, backend) for chunk in iter_init_chunks(inits)])
+        arr = _init_array(inits, backend)
+        if backend == 'python':
+            return cls.from_seqs(_python_batch(arr, True)[2])
+        times, _, history = _step_batch(arr, True)
+        offsets, flat = _pack_history(arr, times, history)
+        return cls(flat, offsets)
+
+    @classmethod
+    def from_seqs(cls, seqs):
+        """Pack a list of sequences, e.g. from max_minus_min_seq"""
+        offsets = np.zeros(len(seqs) + 1, dtype=np.int64)
+        np.cumsum([len(seq) for seq in seqs], out=offsets[1:])
+        flat = [v for seq in seqs for v in seq]
+        values = np.array(flat, dtype=object)
+        if not all(isinstance(v, (int, np.integer)) for v in flat):
+            values = values.astype(np.float64)
+        elif not flat or max(abs(int(v)) for v in flat) < INT64_SAFE_BOUND:
+            values = values.astype(np.int64)
+        return cls(values, offsets)
+
+    @classmethod
+    def concatenate(cls, batches):
+        batches = list(batches)
+        if not batches:
+            return cls(np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64))
+        batches = [batch.compact() for batch in batches]
+        starts = np.cumsum([0] + [len(batch.values) for batch in batches[:-1]])
+        offsets = np.concatenate([[0]] + [batch.offsets[1:] + start for batch, start in zip(batches, starts)])
+        return cls(np.concatenate([batch.values for batch in batches]), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                return SequenceBatch(self.values, self.offsets[start:max(stop, start) + 1])
+            return self.take(np.arange(start, stop, step))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('sequence index out of range')
+        return self.values[self.offsets[index]:self.offsets[index + 1]]
+
+    def __iter__(self):
+        values, bounds = self.values, self.offsets.tolist()
+        for i in range(len(self)):
+            yield values[bounds[i]:bounds[i + 1]]
+
+    def __repr__(self):
+        return f'SequenceBatch({len(self)} sequences, {self.offsets[-1] - self.offsets[0]} terms)'
+
+    @property
+    def times(self):
+        """Convergence time of every sequence, i.e. its length"""
+        return np.diff(self.offsets)
+
+    @property
+    def conv_values(self):
+        """Convergence value of every sequence, i.e. its second to last term"""
+        return self.values[self.offsets[1:] - 2]
+
+    def term(self, k):
+        """Term k of every sequence (all sequences have at least 3 terms)"""
+        return self.values[self.offsets[:-1] + k]
+
+    def take(self, indices):
+        """New compact batch holding the sequences at indices, in that order"""
+        indices = np.asarray(indices, dtype=np.int64)
+        lengths = self.times[indices]
+        offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        gather = np.arange(offsets[-1], dtype=np.int64) + np.repeat(self.offsets[indices] - offsets[:-1], lengths)
+        return SequenceBatch(self.values[gather], offsets)
+
+    def compact(self):
+        """This batch with offsets starting at 0 and no unused values"""
+        if self.offsets[0] == 0 and self.offsets[-1] == len(self.values):
+            return self
+        return SequenceBatch(self.values[self.offsets[0]:self.offsets[-1]], self.offsets - self.offsets[0])
+
+    def tolist(self):
+        """The sequences as a list of lists, as generate_seqs returns them"""
+        flat, bounds = self.values.tolist(), self.offsets.tolist()
+        return [flat[bounds[i]:bounds[i + 1]] for i in range(len(self))]
+
+    def nbytes(self):
+        return self.values.nbytes + self.offsets.nbytes
+
+    def save(self, path):
+        """Write the batch to directory path as values.npy and offsets.npy"""
+        if self.values.dtype == object:
+            raise ValueError('Only int64 batches can be saved; these sequences need Python ints')
+        batch = self.compact()
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'values.npy'), batch.values)
+        np.save(os.path.join(path, 'offsets.npy'), batch.offsets)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Read a batch written by save, memory-mapped unless mmap_mode is None"""
+        return cls(np.load(os.path.join(path, 'values.npy'), mmap_mode=mmap_mode),
+                   np.load(os.path.join(path, 'offsets.npy'), mmap_mode=mmap_mode))
+
+
 ##########################################################
 # Init, sequences, and data functions
 ##########################################################
@@ -72,15 +674,164 @@ def generate_inits_from_sequence(seed_seq):
     return inits
 
 
-def generate_seqs(inits, max_points=None):
-    results = []
-    for init in inits:
-        seq = max_minus_min_seq(init, max_points=max_points)
-        results.append(seq)
-    return results
+##########################################################
+# Lazy and chunked inits
+##########################################################
+
+def iter_inits_random(n, max_val):
+    for _ in range(n):
+        yield generate_random_init(max_val)
+
+
+def iter_inits_As_Ds(As, Ds):
+    for a in As:
+        for d in Ds:
+            yield [a, a+d, a+2*d]
+
+
+def iter_inits_Xs_Ys_Zs(Xs, Ys, Zs):
+    for x in Xs:
+        for y in Ys:
+            for z in Zs:
+                yield [x, y, z]
+
+
+def iter_inits_from_sequence(seed_seq):
+    for i in range(len(seed_seq) - 2):
+        yield [seed_seq[i], seed_seq[i+1], seed_seq[i+2]]
+
+
+def grid_inits(kind, axes, start=0, stop=None):
+    """Inits for flat indices [start, stop) of a row-major parameter grid.
+
+    Args:
+        kind: 'As_Ds' (axes = [As, Ds]) or 'Xs_Ys_Zs' (axes = [Xs, Ys, Zs])
+        axes: Parameter values along each grid axis
+
+    Returns:
+        (stop - start, 3) int64 array, in the order of generate_inits_As_Ds /
+        generate_inits_Xs_Ys_Zs
+    """
+    axes = [np.asarray(axis, dtype=np.int64) for axis in axes]
+    shape = tuple(len(axis) for axis in axes)
+    if stop is None:
+        stop = int(np.prod(shape))
+    coords = np.unravel_index(np.arange(start, stop), shape)
+    if kind == 'As_Ds':
+        a = axes[0][coords[0]]
+        d = axes[1][coords[1]]
+        return np.stack([a, a + d, a + 2*d], axis=1)
+    elif kind == 'Xs_Ys_Zs':
+        return np.stack([axes[i][coords[i]] for i in range(3)], axis=1)
+    else:
+        raise ValueError(f'Invalid grid kind: {kind}')
+
+
+def _chunk_grid(kind, axes, chunk_size):
+    total = int(np.prod([len(axis) for axis in axes]))
+    for start in range(0, total, chunk_size):
+        yield grid_inits(kind, axes, start, min(start + chunk_size, total))
+
+
+def chunk_inits_As_Ds(As, Ds, chunk_size=65536):
+    """Yield the inits of generate_inits_As_Ds as (chunk_size, 3) arrays"""
+    return _chunk_grid('As_Ds', [As, Ds], chunk_size)
+
+
+def chunk_inits_Xs_Ys_Zs(Xs, Ys, Zs, chunk_size=65536):
+    """Yield the inits of generate_inits_Xs_Ys_Zs as (chunk_size, 3) arrays"""
+    return _chunk_grid('Xs_Ys_Zs', [Xs, Ys, Zs], chunk_size)
+
+
+def chunk_inits_random(n, max_val, chunk_size=65536):
+    """Yield n random inits with entries in [0, max_val] as (chunk_size, 3) arrays"""
+    for start in range(0, n, chunk_size):
+        yield np.random.randint(0, max_val + 1, size=(min(chunk_size, n - start), 3), dtype=np.int64)
+
+
+def inits_from_sequence_view(seed_seq):
+    """Sliding windows of generate_inits_from_sequence as a zero-copy (n-2, 3) view"""
+    seed = np.asarray(seed_seq)
+    if seed.dtype.kind == 'f':
+        seed = np.asarray(seed_seq, dtype=object)
+    if len(seed) < 3:
+        return np.zeros((0, 3), dtype=seed.dtype)
+    return np.lib.stride_tricks.sliding_window_view(seed, 3)
+
+
+def _is_chunked(inits):
+    """True if inits is an iterable of init arrays rather than a list of inits"""
+    if isinstance(inits, np.ndarray):
+        return False
+    if isinstance(inits, (list, tuple)):
+        return len(inits) > 0 and isinstance(inits[0], np.ndarray) and inits[0].ndim == 2
+    return True
+
+
+def iter_init_chunks(inits, chunk_size=65536):
+    """Yield inits as (k, 3) arrays of at most chunk_size rows.
+
+    Accepts an (N, 3) array, a list of inits, an iterable of init arrays (as
+    produced by the chunk_inits_* functions) or an iterator of single inits.
+    """
+    if isinstance(inits, np.ndarray) or (isinstance(inits, (list, tuple)) and not _is_chunked(inits)):
+        for start in range(0, len(inits), chunk_size):
+            yield _init_array(inits[start:start + chunk_size])
+        return
+
+    pending = []
+    for item in inits:
+        if isinstance(item, np.ndarray) and item.ndim == 2:
+            if pending:
+                yield _init_array(pending)
+                pending = []
+            for start in range(0, len(item), chunk_size):
+                yield _init_array(item[start:start + chunk_size])
+        else:
+            pending.append(item)
+            if len(pending) == chunk_size:
+                yield _init_array(pending)
+                pending = []
+    if pending:
+        yield _init_array(pending)
+
+
+def _all_triples(inits):
+    """True if a list or array of inits has exactly three terms in each init"""
+    if isinstance(inits, np.ndarray):
+        return inits.size == 0 or (inits.ndim == 2 and inits.shape[1] == 3)
+    return all(len(init) == 3 for init in inits)
+
+
+def generate_seqs(inits, max_points=None, as_batch=False):
+    """Sequences from inits, as a list of lists or with as_batch a SequenceBatch.
+
+    Inits longer than three terms are taken as sequence prefixes, as
+    max_minus_min_seq does; only (N, 3) inits go through the batch engine.
+    """
+    with phase('sequences'):
+        chunked = _is_chunked(inits)
+        if max_points is None and (chunked or _all_triples(inits)):
+            if as_batch:
+                return SequenceBatch.from_inits(inits)
+            if chunked:
+                return [seq for chunk in iter_init_chunks(inits)
+                        for seq in max_minus_min_batch(chunk, return_seqs=True)[2]]
+            return max_minus_min_batch(inits, return_seqs=True)[2]
+        results = []
+        for init in inits:
+            seq = max_minus_min_seq(init, max_points=max_points)
+            results.append(seq)
+        if as_batch:
+            return SequenceBatch.from_seqs(results)
+        return results
 
 
 def generate_data(seqs):
+    if isinstance(seqs, SequenceBatch):
+        firsts = seqs.term(0)
+        return list(zip(firsts.tolist(), (seqs.term(1) - firsts).tolist(),
+                        seqs.times.tolist(), seqs.conv_values.tolist()))
     data = []
     for seq in seqs:
         a = seq[0]
@@ -101,83 +852,113 @@ class TreeNode:
         self.children = []
 
     def get_number_of_nodes(self):
-        total = 1
-        for child in self.children:
-            if child:
-                total += child.get_number_of_nodes()
+        total = 0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            total += 1
+            stack.extend(node.children)
         return total
 
 
-def build_tree(end, n, negatives=False):
-    def build_recursive(current, depth):
-        if depth == 0:
-            return None
-
-        node = TreeNode(current)
-
-        # If does not have backwards, we return node without children
-        has_backwards = (abs(current[0] - current[1]) <= current[2])
-        if not has_backwards:
-            return node
+def backwards_children(current, negatives=False):
+    """Triples one step before current in an MMM sequence, as ordered in build_tree.
 
-        mx = max(current[0], current[1])
-        mn = min(current[0], current[1])
-        diff = current[2]
-
-        child_value_min = (mx - diff, current[0], current[1])
-        child_value_max = (mn + diff, current[0], current[1])
-
-        children_values = []
-        children_values.append(child_value_min)
+    A BLOCK point has none, a DOUBLE point has two and a MULTI point has
+    every value between the first two entries. Children whose first entry is
+    negative are dropped unless negatives is set.
+    """
+    x, y, z = current
+    mx = max(x, y)
+    mn = min(x, y)
 
-        if mx - diff == mn:
-            for i in range(mn+1, mx):
-                children_values.append((i, current[0], current[1]))
+    # If does not have backwards, there are no children
+    if mx - mn > z:
+        return []
 
-        children_values.append(child_value_max)
+    if mx - mn == z:
+        # Every value in [mn, mx] works, from largest to smallest
+        firsts = range(mx, mn - 1, -1)
+    else:
+        firsts = (mn + z, mx - z)
 
-        # Remove all non unique children values and sort
-        children_values = list(set(children_values))
-        children_values.sort(key=lambda tup: -tup[0])
+    if negatives:
+        return [(w, x, y) for w in firsts]
+    return [(w, x, y) for w in firsts if w >= 0]
 
-        opt_negatives = [a < 0 for a, _, _ in children_values]
 
-        children = []
-        for i, tup in enumerate(children_values):
-            if negatives or not opt_negatives[i]:
-                child_node = build_recursive(tup, depth - 1)
-                if child_node is not None:
-                    children.append(child_node)
-        node.children = children
+def build_tree(end, n, negatives=False):
+    """Build the tree of all n-step backwards extensions of end.
 
-        return node
-    root = build_recursive(tuple(end), n)
-    seq = max_minus_min_seq(list(end))
-    prev = root
-    for val in seq[1:]:
-        node = TreeNode((val, 0, 0))
-        node.children = [prev]
-        prev = node
-    return prev
+    The tree is built with an explicit stack, so its depth is not limited by
+    the recursion limit. The returned root is the last term of the sequence
+    continued forward from end, with the forward terms chained down to the
+    backwards tree.
+    """
+    with phase('tree'):
+        root = TreeNode(tuple(end)) if n > 0 else None
+        stack = [(root, n)] if n > 0 else []
+        built = len(stack)
+        while stack:
+            node, depth = stack.pop()
+            if depth > 1:
+                children = [TreeNode(child) for child in backwards_children(node.value, negatives)]
+                node.children = children
+                stack.extend([(child, depth - 1) for child in children])
+                built += len(children)
+
+        seq = max_minus_min_seq(list(end))
+        prev = root
+        for val in seq[1:]:
+            node = TreeNode((val, 0, 0))
+            node.children = [prev]
+            prev = node
+        if instrumentation.enabled:
+            instrumentation.count('nodes', built + len(seq) - 1)
+        return prev
+
+
+def tree_height(tree):
+    """Number of nodes on the longest root-to-leaf path"""
+    height = 0
+    stack = [(tree, 1)]
+    while stack:
+        node, depth = stack.pop()
+        height = max(height, depth)
+        stack.extend((child, depth + 1) for child in node.children if child is not None)
+    return height
+
+
+def iter_paths(tree):
+    """Yield every leaf-to-root path of tree as a padded tuple, one at a time.
+
+    Paths come out in the same order and with the same leading None padding
+    as get_all_paths, but are produced by an iterative depth-first walk that
+    writes into a single buffer, so only one path is held at a time.
+    """
+    assert tree is not None, "Tree is None"
+    width = tree_height(tree)
+    buffer = [None] * width
+    stack = [(tree, width - 1)]
+    while stack:
+        node, pos = stack.pop()
+        buffer[pos] = node.value[0]
+        if node.children == []:
+            if instrumentation.enabled:
+                instrumentation.count('paths')
+            yield tuple(buffer[pos:]) if pos == 0 else (None,) * pos + tuple(buffer[pos:])
+            continue
+        for child in reversed(node.children):
+            assert child is not None, "Child is None"
+            stack.append((child, pos - 1))
 
 
 def get_all_paths(tree):
-    # Assertion that tree is not none
-    assert tree is not None, "Tree is None"
-    # If the node is a leaf, return a list with one path that only contains this node's value.
-    if tree.children == []:
-        return [[tree.value[0]]]
-    
-    all_paths = []
-    for child in tree.children:
-        # assertion that child is not none
-        assert child is not None, "Child is None"
-        child_paths = get_all_paths(child)
-        # For each path from the child, append current node's value.
-        for path in child_paths:
-            all_paths.append(path + [tree.value[0]])
-    all_paths = pad_paths(all_paths)
-    return all_paths
+    with phase('paths'):
+        return [list(path) for path in iter_paths(tree)]
+
 
 def pad_paths(paths):
     # Find the maximum length among all paths
@@ -204,6 +985,8 @@ class BackwardsPointType(Enum):
     BLOCK = "BLOCK"
 
 class Signature:
+    __slots__ = ('at_0', 'at_1', 'at_2')
+
     def __init__(self, at_0: SignatureType, at_1: SignatureType, at_2: SignatureType):
         self.at_0 = at_0
         self.at_1 = at_1
@@ -213,6 +996,8 @@ class Signature:
         return f"Signature(at_0={self.at_0.value}, at_1={self.at_1.value}, at_2={self.at_2.value})"
 
 class LabeledSequenceValue:
+    __slots__ = ('value', 'signature', 'is_ignored', 'is_shifting_point', 'backwards_point_type')
+
     def __init__(self, value: Tuple[int, int, int], signature: Signature, is_ignored: bool, is_shifting_point: bool, backwards_point_type: BackwardsPointType):
         self.value = value
         self.signature = signature
@@ -234,6 +1019,8 @@ def label_sequence(sequence: List[int]) -> List[LabeledSequenceValue]:
         labeled_value = label_value(sequence, i)
         result.append(labeled_value)
     
+    if instrumentation.enabled:
+        instrumentation.count('labels', len(result) - result.count(None))
     return result
 
 def label_value(sequence: List[int], index: int) -> LabeledSequenceValue:
@@ -404,58 +1191,467 @@ def get_signature_in_window(window: List[int], pos: int) -> SignatureType:
 
 def label_all_paths(paths: List[List[int]]) -> List[List[LabeledSequenceValue]]:
     """Apply labeling to all paths"""
-    return [label_sequence(path) for path in paths]
+    with phase('labeling'):
+        return [label_sequence(path) for path in paths]
+
+
+##########################################################
+# Backwards tree statistics
+##########################################################
+
+# Small-int codes for BackwardsPointType, used by the array-based functions
+BACKWARDS_POINT_TYPES = [BackwardsPointType.MULTI, BackwardsPointType.DOUBLE, BackwardsPointType.BLOCK]
+MULTI_CODE, DOUBLE_CODE, BLOCK_CODE = 0, 1, 2
+
+
+def backwards_point_type_codes(triples):
+    """Codes of BACKWARDS_POINT_TYPES for each row (X, Y, Z) of an (N, 3) array"""
+    diff = np.abs(triples[:, 0] - triples[:, 1])
+    third = triples[:, 2]
+    return np.where(diff > third, BLOCK_CODE, np.where(diff == third, MULTI_CODE, DOUBLE_CODE)).astype(np.uint8)
+
+
+def expand_backwards(triples, negatives=False):
+    """Vectorized backwards_children for every row of an (N, 3) array.
+
+    Returns:
+        (children, counts) where children stacks each row's children in
+        backwards_children order and counts[i] is the number row i has
+    """
+    x, y, z = triples[:, 0], triples[:, 1], triples[:, 2]
+    mx = np.maximum(x, y)
+    mn = np.minimum(x, y)
+    types = backwards_point_type_codes(triples)
+    counts = np.where(types == MULTI_CODE, mx - mn + 1,
+                      np.where(types == DOUBLE_CODE, 2, 0)).astype(np.int64)
+
+    parent = np.repeat(np.arange(len(triples)), counts)
+    starts = np.cumsum(counts) - counts
+    j = np.arange(len(parent)) - starts[parent]
+    multi = types[parent] == MULTI_CODE
+    # MULTI children run from mx down to mn; DOUBLE children are mn + z, mx - z
+    w = np.where(multi, mx[parent] - j,
+                 np.where(j == 0, mn[parent] + z[parent], mx[parent] - z[parent]))
+    children = np.stack([w, x[parent], y[parent]], axis=1).astype(triples.dtype)
+
+    if not negatives:
+        keep = w >= 0
+        children = children[keep]
+        counts = np.bincount(parent[keep], minlength=len(triples)).astype(np.int64)
+    return children, counts
+
+
+class BackwardsTreeStats:
+    """Counts describing build_tree(end, n, negatives) without building it.
+
+    nodes matches build_tree(...).get_number_of_nodes() and paths matches
+    len(get_all_paths(...)). level_nodes[k] and level_types[k] (a dict from
+    BackwardsPointType to count) describe the backwards nodes k steps before
+    end, with level 0 being end itself.
+    """
+
+    def __init__(self, nodes, leaves, paths, level_nodes, level_types):
+        self.nodes = nodes
+        self.leaves = leaves
+        self.paths = paths
+        self.level_nodes = level_nodes
+        self.level_types = level_types
+
+    def __repr__(self):
+        return f"BackwardsTreeStats(nodes={self.nodes}, leaves={self.leaves}, paths={self.paths}, depth={len(self.level_nodes)})"
+
+
+def backwards_tree_stats(end, n, negatives=False, chunk_size=65536):
+    """Node, leaf, path and point type counts of a backwards tree.
+
+    The tree is walked depth first in chunks of up to chunk_size triples that
+    are expanded with NumPy, so memory stays bounded by chunk_size * n and no
+    TreeNode objects are created.
+    """
+    # Each backwards step at most doubles the largest entry
+    bound = max(abs(v) for v in end) * 2**max(n, 0)
+    dtype = np.int64 if bound < INT64_SAFE_BOUND else object
+
+    level_types = np.zeros((max(n, 0), 3), dtype=np.int64)
+    leaves = 0
+    stack = [(np.array([end], dtype=dtype), 0)] if n > 0 else []
+    while stack:
+        frontier, level = stack.pop()
+        level_types[level] += np.bincount(backwards_point_type_codes(frontier), minlength=3)
+        if level == n - 1:
+            leaves += len(frontier)
+            continue
+        children, counts = expand_backwards(frontier, negatives)
+        leaves += int(np.count_nonzero(counts == 0))
+        for start in range(0, len(children), chunk_size):
+            stack.append((children[start:start + chunk_size], level + 1))
+
+    level_nodes = level_types.sum(axis=1).tolist()
+    forward_nodes = len(max_minus_min_seq(list(end))) - 1
+    return BackwardsTreeStats(
+        nodes=sum(level_nodes) + forward_nodes,
+        leaves=leaves,
+        paths=leaves,
+        level_nodes=level_nodes,
+        level_types=[{t: int(row[code]) for code, t in enumerate(BACKWARDS_POINT_TYPES)} for row in level_types],
+    )
+
+
+##########################################################
+# Inverse search
+##########################################################
+
+def _term_bounds(box, negatives):
+    """Bounds function (index -> (lo, hi)) on sequence terms for inits in box.
+
+    Indices 0, 1, 2 are the init, bounded by box. Later terms are max - min
+    of three earlier terms, so they are at least 0 and, once the window
+    holds only such terms, never exceed its maximum. Each of the first three
+    computed terms can exceed the previous bound by at most -min(box), so
+    everything from index 5 on shares the bound of index 5.
+    """
+    lows = [lo if negatives else max(lo, 0) for lo, _ in box]
+    highs = [hi for _, hi in box]
+    top = max(max(highs), 0)
+    under = -min(min(lows), 0)
+
+    def bounds(index):
+        if index < 3:
+            return lows[index], highs[index]
+        # 0 would end the sequence there, so every term before the last is >= 1
+        return 1, top + min(index - 2, 3) * under
+    return bounds
+
+
+def find_inits(value, time, box, negatives=False, chunk_size=65536):
+    """Every init in box whose sequence has convergence value and time as given.
+
+    The sequence of such an init ends [..., value, value, value, 0], so the
+    search starts from the window (value, value, value) at index time - 4 and
+    expands backwards with expand_backwards, the array form of the
+    build_tree rules. After each step the new first term must fit the
+    bounds _term_bounds gives for its index; children that do not are
+    pruned along with their whole subtree. Frontiers are processed depth
+    first in chunks of chunk_size rows, as in backwards_tree_stats.
+
+    Args:
+        value: Convergence value, seq[-2]
+        time: Convergence time, len(seq)
+        box: ((min_x, max_x), (min_y, max_y), (min_z, max_z)) bounds on the
+            init, inclusive
+        negatives: Allow negative init values (otherwise box is clipped at 0)
+        chunk_size: Most rows expanded at once
+
+    Returns:
+        (N, 3) array of the matching inits in lexicographic order, such that
+        max_minus_min_seq(init) has length time and seq[-2] == value
+    """
+    bounds = _term_bounds(box, negatives)
+    empty = np.zeros((0, 3), dtype=np.int64)
+    if time < 3:
+        return empty
+    if time == 3:
+        # The init itself already ends in a term <= 0
+        (x_lo, x_hi), (y_lo, y_hi), (z_lo, z_hi) = [bounds(k) for k in range(3)]
+        if not y_lo <= value <= y_hi or min(z_hi, 0) < z_lo:
+            return empty
+        xs = np.arange(x_lo, x_hi + 1, dtype=np.int64)
+        zs = np.arange(z_lo, min(z_hi, 0) + 1, dtype=np.int64)
+        X, Z = np.meshgrid(xs, zs, indexing='ij')
+        return np.stack([X.ravel(), np.full(X.size, value, dtype=np.int64), Z.ravel()], axis=1)
+
+    start = time - 4
+    for index in range(start, start + 3):
+        lo, hi = bounds(index)
+        # The init's last term must be positive for the sequence to step at all
+        lo = max(lo, 1) if index == 2 else lo
+        if not lo <= value <= hi:
+            return empty
+
+    dtype = np.int64 if bounds(5)[1] < INT64_SAFE_BOUND else object
+    found = []
+    stack = [(np.array([[value, value, value]], dtype=dtype), start)]
+    while stack:
+        frontier, index = stack.pop()
+        if index == 0:
+            found.append(frontier)
+            continue
+        children, _ = expand_backwards(frontier, negatives)
+        lo, hi = bounds(index - 1)
+        if index - 1 == 2:
+            lo = max(lo, 1)
+        first = children[:, 0]
+        children = children[(first >= lo) & (first <= hi)]
+        for offset in range(0, len(children), chunk_size):
+            stack.append((children[offset:offset + chunk_size], index - 1))
+
+    if not found:
+        return empty
+    inits = np.concatenate(found)
+    return inits[np.lexsort(inits.T[::-1])]
+
+
+##########################################################
+# Batch labeling
+##########################################################
+
+# Small-int codes for SignatureType, used by the array-based functions
+SIGNATURE_TYPES = [SignatureType.MAX, SignatureType.MIN, SignatureType.MID, SignatureType.NA]
+MAX_CODE, MIN_CODE, MID_CODE, NA_CODE = 0, 1, 2, 3
+
+# Codes get_signature_in_window gives positions 0, 1, 2 of an all-equal window
+_ALL_EQUAL_CODES = (MIN_CODE, MAX_CODE, MID_CODE)
+
+
+def paths_to_array(paths):
+    """Pack padded paths (as from iter_paths) into arrays for label_paths_array.
+
+    Returns:
+        (values, mask): (num_paths, length) arrays where mask is True for the
+        leading None padding, whose values are set to 0
+    """
+    paths = list(paths)
+    length = max((len(path) for path in paths), default=0)
+    mask = np.array([[v is None for v in path] for path in paths], dtype=bool).reshape(len(paths), length)
+    values = np.array([[0 if v is None else v for v in path] for path in paths], dtype=object)
+    values = values.reshape(len(paths), length)
+    if values.size and max(abs(v) for v in values.flat) >= INT64_SAFE_BOUND:
+        return values, mask
+    return values.astype(np.int64), mask
+
+
+def label_paths_array(values, mask):
+    """Vectorized label_sequence over many padded paths at once.
+
+    Args:
+        values: (num_paths, length) integer array of path values
+        mask: (num_paths, length) bool array, True for leading padding
+
+    Returns:
+        (signatures, is_ignored, is_shifting_point, backwards_point_types):
+        signatures is a (num_paths, length, 3) uint8 array of SIGNATURE_TYPES
+        codes for at_0, at_1, at_2, backwards_point_types a (num_paths, length)
+        uint8 array of BACKWARDS_POINT_TYPES codes, and the other two are bool
+        arrays. Each matches label_value on the path with its padding
+        stripped; entries under mask are NA / False / MULTI.
+    """
+    num_paths, length = values.shape
+    num_windows = max(length - 2, 0)
+    starts = mask.sum(axis=1)
+
+    signatures = np.full((num_paths, length, 3), NA_CODE, dtype=np.uint8)
+    is_shifting = np.zeros((num_paths, length), dtype=bool)
+    point_types = np.full((num_paths, length), MULTI_CODE, dtype=np.uint8)
+
+    if num_windows > 0:
+        windows = np.lib.stride_tricks.sliding_window_view(values, 3, axis=1)
+        window_valid = np.arange(num_windows)[None, :] >= starts[:, None]
+
+        # argmax/argmin return the first occurrence, as list.index does
+        all_equal = (windows[..., 0] == windows[..., 1]) & (windows[..., 1] == windows[..., 2])
+        max_pos = windows.argmax(axis=2)
+        min_pos = windows.argmin(axis=2)
+        for pos in range(3):
+            codes = np.where(max_pos == pos, MAX_CODE, np.where(min_pos == pos, MIN_CODE, MID_CODE))
+            codes = np.where(all_equal, _ALL_EQUAL_CODES[pos], codes)
+            signatures[:, pos:pos + num_windows, pos] = np.where(window_valid, codes, NA_CODE)
+
+        gcds = np.gcd.reduce(windows, axis=2)
+        is_shifting[:, 1:num_windows] = (gcds[:, 1:] > gcds[:, :-1]) & window_valid[:, :-1]
+
+        flat_windows = windows.reshape(-1, 3)
+        point_types[:, :num_windows] = backwards_point_type_codes(flat_windows).reshape(num_paths, num_windows)
+        point_types[mask] = MULTI_CODE
+
+    is_ignored = ((signatures == MID_CODE) | (signatures == NA_CODE)).all(axis=2) & ~mask
+    return signatures, is_ignored, is_shifting, point_types
+
+
+##########################################################
+# Compact labeled paths
+##########################################################
+
+# One shared Signature per packed code at_0 | at_1 << 2 | at_2 << 4
+_PACKED_SIGNATURES = [Signature(SIGNATURE_TYPES[code & 3], SIGNATURE_TYPES[(code >> 2) & 3],
+                                SIGNATURE_TYPES[code >> 4]) for code in range(64)]
+
+IGNORED_FLAG = 1
+SHIFTING_FLAG = 2
+
+
+class LabeledPaths:
+    """Columnar labels for many padded paths, three bytes per value.
+
+    Signatures are packed into one uint8 per value (two bits per position),
+    is_ignored / is_shifting_point into a uint8 bitfield and backwards point
+    types into uint8 codes. Indexing gives a LabeledPathView that builds
+    LabeledSequenceValue objects only for the elements actually accessed, so
+    code written for label_all_paths output keeps working.
+    """
+
+    def __init__(self, values, mask, signatures, flags, point_types):
+        self.values = values
+        self.mask = mask
+        self.signatures = signatures
+        self.flags = flags
+        self.point_types = point_types
+
+    @classmethod
+    def from_paths(cls, paths):
+        """Label padded paths of equal length, as from iter_paths"""
+        values, mask = paths_to_array(paths)
+        return cls.from_array(values, mask)
+
+    @classmethod
+    def from_array(cls, values, mask):
+        with phase('labeling'):
+            signatures, is_ignored, is_shifting, point_types = label_paths_array(values, mask)
+            packed = signatures[..., 0] | (signatures[..., 1] << 2) | (signatures[..., 2] << 4)
+            flags = is_ignored.astype(np.uint8) * IGNORED_FLAG | is_shifting.astype(np.uint8) * SHIFTING_FLAG
+        if instrumentation.enabled:
+            instrumentation.count('labels', int(mask.size - np.count_nonzero(mask)))
+        return cls(values, mask, packed, flags, point_types)
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('path index out of range')
+        return LabeledPathView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield LabeledPathView(self, index)
+
+    @property
+    def is_ignored(self):
+        return (self.flags & IGNORED_FLAG) != 0
+
+    @property
+    def is_shifting_point(self):
+        return (self.flags & SHIFTING_FLAG) != 0
+
+    def signature_codes(self):
+        """Unpacked (num_paths, length, 3) SIGNATURE_TYPES codes"""
+        return np.stack([self.signatures & 3, (self.signatures >> 2) & 3, self.signatures >> 4], axis=-1)
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.values, self.mask, self.signatures, self.flags, self.point_types))
+
+
+class LabeledPathView:
+    """One path of a LabeledPaths, indexable like a list from label_sequence"""
+    __slots__ = ('_labels', '_row')
+
+    def __init__(self, labels, row):
+        self._labels = labels
+        self._row = row
+
+    def __len__(self):
+        return self._labels.values.shape[1]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        labels, row = self._labels, self._row
+        if labels.mask[row, index]:
+            return None
+        flags = labels.flags[row, index]
+        return LabeledSequenceValue(
+            value=int(labels.values[row, index]),
+            signature=_PACKED_SIGNATURES[labels.signatures[row, index]],
+            is_ignored=bool(flags & IGNORED_FLAG),
+            is_shifting_point=bool(flags & SHIFTING_FLAG),
+            backwards_point_type=BACKWARDS_POINT_TYPES[labels.point_types[row, index]]
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+def iter_labeled_path_chunks(paths, chunk_size=4096):
+    """Label a stream of equal-length padded paths chunk by chunk as LabeledPaths"""
+    chunk = []
+    for path in paths:
+        chunk.append(path)
+        if len(chunk) == chunk_size:
+            yield LabeledPaths.from_paths(chunk)
+            chunk = []
+    if chunk:
+        yield LabeledPaths.from_paths(chunk)
 
 
 ##########################################################
 # Other sequences
 ##########################################################
 
-def primes(n, reverse=False):
+# All primes below _sieved_limit, grown on demand by _extend_primes
+_prime_cache = np.array([2, 3, 5, 7], dtype=np.int64)
+_sieved_limit = 10
+PRIME_SEGMENT_SIZE = 2**22
+
+
+def _extend_primes(limit):
+    """Sieve [_sieved_limit, limit) segment by segment into the prime cache"""
+    global _prime_cache, _sieved_limit
+    found = [_prime_cache]
+    lo = _sieved_limit
+    while lo < limit:
+        # Base primes must cover sqrt(hi), and the cache only goes up to lo
+        hi = min(limit, lo + PRIME_SEGMENT_SIZE, lo * lo)
+        segment = np.ones(hi - lo, dtype=bool)
+        base = np.concatenate(found)
+        for p in base[base * base < hi].tolist():
+            start = max(p * p, -(-lo // p) * p)
+            segment[start - lo::p] = False
+        found.append(lo + np.flatnonzero(segment))
+        lo = hi
+    _prime_cache = np.concatenate(found)
+    _sieved_limit = max(_sieved_limit, lo)
+
+
+def clear_prime_cache():
+    """Drop every sieved prime, e.g. to time the sieve from scratch"""
+    global _prime_cache, _sieved_limit
+    _prime_cache = np.array([2, 3, 5, 7], dtype=np.int64)
+    _sieved_limit = 10
+
+
+def primes_array(n):
+    """The first n primes as an int64 array, from a cached segmented sieve"""
     if n <= 0:
-        return []
-    
-    # Handle first three primes manually
-    if n == 1:
-        return [2]
-    if n == 2:
-        return [2, 3]
-    
-    primes = [2, 3]  # Start with 2 and 3
-    k = 1  # First number to check will be 6k - 1 = 5
-    
-    while len(primes) < n:
-        # Check numbers of the form 6k - 1
-        num = 6 * k - 1
-        is_prime = True
-        for p in primes:
-            if p * p > num:
-                break
-            if num % p == 0:
-                is_prime = False
-                break
-        if is_prime:
-            primes.append(num)
-            if len(primes) == n:
-                break
-        
-        # Check numbers of the form 6k + 1
-        num = 6 * k + 1
-        is_prime = True
-        for p in primes:
-            if p * p > num:
-                break
-            if num % p == 0:
-                is_prime = False
-                break
-        if is_prime:
-            primes.append(num)
-        
-        k += 1
-    
+        return np.zeros(0, dtype=np.int64)
+    while len(_prime_cache) < n:
+        # p_n < n (ln n + ln ln n) for n >= 6
+        estimate = int(n * (math.log(n) + math.log(math.log(n)))) + 1 if n >= 6 else 14
+        _extend_primes(max(estimate, 2 * _sieved_limit))
+    return _prime_cache[:n].copy()
+
+
+def iter_primes():
+    """Yield the primes in order without an upper bound"""
+    index = 0
+    while True:
+        if index == len(_prime_cache):
+            _extend_primes(2 * _sieved_limit)
+        block = _prime_cache[index:].tolist()
+        yield from block
+        index += len(block)
+
+
+def primes(n, reverse=False):
+    result = primes_array(n).tolist()
     if reverse:
-        primes.reverse()
-    return primes
+        result.reverse()
+    return result
 
 
 def prime_powers(n, k=2):
@@ -474,7 +1670,8 @@ def prime_products(n, k=2):
     primes_list = primes(k*n + k)
     result = []
     for i in range(0, k*n, k):
-        product = np.prod(primes_list[i:i+k])
+        # math.prod keeps Python ints exact where np.prod would wrap at int64
+        product = math.prod(primes_list[i:i+k])
         result.append(product)
 
     return result
@@ -524,3 +1721,30 @@ def primes_even(n):
 def primes_odd(n):
     prime_sample = primes(2*n)
     return [p for i, p in enumerate(prime_sample) if (i+1) % 2 == 1]
+
+
+SEED_FUNCTIONS = {
+    'primes': primes,
+    'prime_powers': prime_powers,
+    'primorials': primorials,
+    'prime_products': prime_products,
+    'naturals': naturals,
+    'randoms': randoms,
+    'randoms_inc': randoms_inc,
+    'odds': odds,
+    'odds_random': odds_random,
+    'odds_skip': odds_skip,
+    'primes_random': primes_random,
+    'primes_even': primes_even,
+    'primes_odd': primes_odd
+}
+
+# Seed functions whose output for n is a prefix of their output for any
+# larger n, so one long seed serves every shorter length
+PREFIX_STABLE_SEEDS = {'primes', 'prime_powers', 'primorials', 'prime_products', 'naturals',
+                       'odds', 'odds_skip', 'primes_even', 'primes_odd'}
+
+
+def seed_length(seq_func, n):
+    """Length of SEED_FUNCTIONS[seq_func](n)"""
+    return n + 1 if seq_func == 'primorials' else n
@@ -0,0 +1,148 @@
+import functools
+import time
+from collections import defaultdict
+
+##########################################################
+# Opt-in counters and phase timers
+##########################################################
+
+# Checked by every hook before doing any work, so while this is False the
+# instrumented code pays for one attribute lookup per call and nothing more
+enabled = False
+
+
+class Summary:
+    """Counters and per-phase timings collected while instrumentation is enabled.
+
+    counters maps a name such as 'steps', 'nodes', 'paths' or 'labels' to
+    its total. phases maps a phase name to [calls, seconds]; nested phases
+    are timed inclusively, so an outer phase includes the inner ones.
+    """
+
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.phases = defaultdict(lambda: [0, 0.0])
+
+    def reset(self):
+        self.counters.clear()
+        self.phases.clear()
+
+    def as_dict(self):
+        return {'counters': dict(self.counters),
+                'phases': {name: {'calls': calls, 'seconds': seconds}
+                           for name, (calls, seconds) in self.phases.items()}}
+
+    def __str__(self):
+        lines = []
+        for name, (calls, seconds) in sorted(self.phases.items(), key=lambda item: -item[1][1]):
+            lines.append(f'{name:<24} {seconds:10.4f}s  {calls:>8} call(s)')
+        for name, total in self.counters.items():
+            lines.append(f'{name:<24} {total:>11}')
+        return '\n'.join(lines) if lines else 'Nothing recorded'
+
+    def __repr__(self):
+        return f'Summary({self.as_dict()})'
+
+
+summary = Summary()
+# Summary of the most recent instrument() block
+last_summary = None
+
+
+def count(name, n=1):
+    """Add n to counter name (a no-op unless enabled)"""
+    if enabled:
+        summary.counters[name] += n
+
+
+class _Phase:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        entry = summary.phases[self.name]
+        entry[0] += 1
+        entry[1] += time.perf_counter() - self.start
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def phase(name):
+    """Context manager timing its body as phase name (a shared no-op unless enabled)"""
+    if enabled:
+        return _Phase(name)
+    return _NULL_PHASE
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    summary.reset()
+
+
+class instrument:
+    """Collect a fresh Summary for the duration of a with block.
+
+        with instrument() as s:
+            build_tree((12, 12, 12), 15)
+        print(s)
+
+    The previous enabled state and summary are restored afterwards, and the
+    block's summary is also kept as last_summary.
+    """
+
+    def __enter__(self):
+        global enabled, summary
+        self._saved = (enabled, summary)
+        summary = Summary()
+        enabled = True
+        return summary
+
+    def __exit__(self, *exc):
+        global enabled, summary, last_summary
+        last_summary = summary
+        enabled, summary = self._saved
+
+
+def profiled(func):
+    """Give func a profile keyword argument.
+
+    With profile=True, func runs under instrument() as a single phase named
+    after it, and the summary is printed once it returns; it stays available
+    as last_summary.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, profile=False, **kwargs):
+        if not profile:
+            return func(*args, **kwargs)
+        with instrument() as result_summary:
+            with phase(func.__name__):
+                result = func(*args, **kwargs)
+        print(result_summary)
+        return result
+    return wrapper
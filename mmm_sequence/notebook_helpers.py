@@ -1,7 +1,10 @@
 from core import *
+from sweep import *
 from visualization import *
+from instrumentation import profiled
 
 
+@profiled
 def plot_sequence(init, max_points=None, conv_data_only=False):
     """Generate and plot a max-minus-min sequence.
     
@@ -9,10 +12,13 @@ def plot_sequence(init, max_points=None, conv_data_only=False):
         init: Tuple of 3 integers representing initial values
         max_points: Maximum number of points to generate (None for all points)
         conv_data_only: If True, return only convergence data; if False, plot the sequence
+        profile: If True, print counters and phase timings afterwards (see instrumentation)
     
     Returns:
         The sequence if conv_data_only is False, otherwise the convergence value
     """
+    if conv_data_only and max_points is None:
+        return convergence_stats(init)[1]
     seq = generate_seqs([init], max_points)[0]
     if conv_data_only:
         return seq[-2]
@@ -20,10 +26,11 @@ def plot_sequence(init, max_points=None, conv_data_only=False):
     return seq
 
 
+@profiled
 def plot_sequences(inits_category='random', n=1, max_val=100, 
                   min_a=0, max_a=10, min_d=0, max_d=10,
                   min_x=0, max_x=5, min_y=0, max_y=5, min_z=0, max_z=5,
-                  inits=None):
+                  inits=None, mode='auto', as_batch=False):
     """Generate and plot multiple sequences based on different initialization methods.
     
     Args:
@@ -31,7 +38,13 @@ def plot_sequences(inits_category='random', n=1, max_val=100,
         n: Number of sequences for random category
         max_val: Maximum value for random initialization
         min/max_a/d/x/y/z: Range bounds for respective parameters
-        inits: List of tuples for manual category, each tuple containing 3 integers
+        inits: Inits for manual category: a list of 3-integer tuples, an (N, 3)
+            array, or chunks of inits such as those from chunk_inits_As_Ds
+        mode: How plot_multiple_curves draws the curves; by default large
+            batches go into one LineCollection, downsampled and without a legend
+        as_batch: Return the sequences as a compact SequenceBatch instead of
+            a list of lists
+        profile: If True, print counters and phase timings afterwards
     """
     inits_list = []
 
@@ -47,34 +60,68 @@ def plot_sequences(inits_category='random', n=1, max_val=100,
         Zs = list(range(min_z, max_z + 1))
         inits_list = generate_inits_Xs_Ys_Zs(Xs, Ys, Zs)
     elif inits_category == 'manual':
-        if not inits:
+        if inits is not None and not isinstance(inits, np.ndarray):
+            inits = list(inits)
+        if inits is None or len(inits) == 0:
             raise ValueError("For 'manual' category, you must provide initial values in the inits parameter")
-        inits_list = list(inits)
+        inits_list = inits
     else:
         raise ValueError(f'Invalid inits_category: {inits_category}')
         
-    seqs = generate_seqs(inits_list, max_points=None)
-    plot_multiple_curves(seqs)
+    seqs = generate_seqs(inits_list, max_points=None, as_batch=as_batch)
+    plot_multiple_curves(seqs, mode=mode)
     return seqs
 
 
-def plot_convergence_3d(plot_type='time', min_a=0, max_a=100, min_d=0, max_d=100):
+@profiled
+def plot_convergence_3d(plot_type='time', min_a=0, max_a=100, min_d=0, max_d=100,
+                        workers=1, chunk_size=65536, store=None):
     """Create a 3D plot of convergence data.
     
     Args:
         plot_type: Either 'time' or 'value'
         min/max_a/d: Range bounds for A and D parameters
+        workers: Number of processes for the sweep (None for all cores)
+        chunk_size: Number of inits per parallel tile
+        store: Path of a SweepStore written by run_sweep_job to read the
+            window from instead of recomputing it
+        profile: If True, print counters and phase timings afterwards
     """
-    As = list(range(min_a, max_a + 1))
-    Ds = list(range(min_d, max_d + 1))
-    inits = generate_inits_As_Ds(As, Ds)
-    seqs = generate_seqs(inits, max_points=None)
-    data = generate_data(seqs)
-    create_interactive_plot(data, plot_type)
+    if store is not None:
+        As, Ds, times, values = SweepStore(store).read_window(min_a, max_a, min_d, max_d)
+    else:
+        As = list(range(min_a, max_a + 1))
+        Ds = list(range(min_d, max_d + 1))
+        times, values = sweep_As_Ds(As, Ds, workers=workers, chunk_size=chunk_size)
+    create_interactive_plot((As, Ds, times, values), plot_type)
+
 
+@profiled
+def plot_convergence_map(plot_type='time', min_a=0, max_a=1000, min_d=0, max_d=1000,
+                         resolution=512, log=True, workers=1):
+    """Create a zoomable 2D heatmap of convergence data.
 
+    Only the visible window is computed, at most resolution samples per
+    axis, and it is recomputed after every zoom or pan. This makes it
+    practical to browse ranges far beyond what plot_convergence_3d can draw.
+
+    Args:
+        plot_type: Either 'time' or 'value'
+        min/max_a/d: Range bounds for A and D parameters in the initial view
+        resolution: Most samples along each axis
+        log: Use a log color scale
+        workers: Number of processes for each recompute (None for all cores)
+        profile: If True, print counters and phase timings afterwards
+    """
+    def compute(As, Ds):
+        return sweep_As_Ds(As, Ds, workers=workers)
+    create_interactive_map(compute, plot_type, (min_a, max_a), (min_d, max_d), resolution, log)
+
+
+@profiled
 def plot_convergence_2d(plot_type='time', vary_param='a', 
-                       min_vary=0, max_vary=100, fixed_val=50):
+                       min_vary=0, max_vary=100, fixed_val=50,
+                       workers=1, chunk_size=65536, store=None):
     """Create a 2D plot of convergence data.
     
     Args:
@@ -82,6 +129,11 @@ def plot_convergence_2d(plot_type='time', vary_param='a',
         vary_param: Either 'a' or 'd'
         min/max_vary: Range for the varying parameter
         fixed_val: Value for the fixed parameter
+        workers: Number of processes for the sweep (None for all cores)
+        chunk_size: Number of inits per parallel tile
+        store: Path of a SweepStore written by run_sweep_job to read the
+            values from instead of recomputing them
+        profile: If True, print counters and phase timings afterwards
     """
     As = []
     Ds = []
@@ -96,19 +148,22 @@ def plot_convergence_2d(plot_type='time', vary_param='a',
     else:
         raise ValueError(f'Invalid vary_param: {vary_param}')
 
-    inits = generate_inits_As_Ds(As, Ds)
-    seqs = generate_seqs(inits, max_points=None)
+    if store is not None:
+        _, _, times, values = SweepStore(store).read_window(As[0], As[-1], Ds[0], Ds[-1])
+    else:
+        times, values = sweep_As_Ds(As, Ds, workers=workers, chunk_size=chunk_size)
 
     if plot_type == 'time':
-        conv_times = [len(seq) for seq in seqs]
+        conv_times = times.ravel().tolist()
         plot_multiple_curves([conv_times], [x_val_list])
         return conv_times
     elif plot_type == 'value':
-        conv_values = [seq[-2] for seq in seqs]
+        conv_values = values.ravel().tolist()
         plot_multiple_curves([conv_values], [x_val_list])
         return conv_values
 
 
+@profiled
 def analyze_seed_sequence(seq_func='primes', plot_seqs=True, plot_values=True, 
                          plot_times=True, n=100, **kwargs):
     """Analyze sequences generated from a seed sequence.
@@ -120,34 +175,25 @@ def analyze_seed_sequence(seq_func='primes', plot_seqs=True, plot_values=True,
         plot_seqs/values/times: Booleans controlling which plots to generate
         n: Length of seed sequence
         **kwargs: Additional arguments for the sequence function
+        profile: If True, print counters and phase timings afterwards
+
+    Returns:
+        (seqs, conv_values, conv_times). seqs is None unless plot_seqs is set,
+        since the full sequences are only built when they are plotted.
     """
-    func_map = {
-        'primes': primes,
-        'prime_powers': prime_powers,
-        'primorials': primorials,
-        'prime_products': prime_products,
-        'naturals': naturals,
-        'randoms': randoms,
-        'randoms_inc': randoms_inc,
-        'odds': odds,
-        'odds_random': odds_random,
-        'odds_skip': odds_skip,
-        'primes_random': primes_random,
-        'primes_even': primes_even,
-        'primes_odd': primes_odd
-    }
-
-    if seq_func not in func_map:
+    if seq_func not in SEED_FUNCTIONS:
         raise ValueError(f'Invalid sequence function: {seq_func}')
 
-    chosen_func = func_map[seq_func]
-    inits = generate_inits_from_sequence(chosen_func(n, **kwargs))
-    seqs = generate_seqs(inits)
+    chosen_func = SEED_FUNCTIONS[seq_func]
+    inits = inits_from_sequence_view(chosen_func(n, **kwargs))
+    times, values = convergence_stats_many(inits)
 
-    conv_values = [seq[-2] for seq in seqs]
-    conv_times = [len(seq) for seq in seqs]
+    conv_values = values.tolist()
+    conv_times = times.tolist()
 
+    seqs = None
     if plot_seqs:
+        seqs = generate_seqs(inits)
         plot_multiple_curves(seqs, title='MMM Sequences from Seed Sequence')
     if plot_values:
         plot_multiple_curves([conv_values], title='Convergence Value vs Index in Seed Sequence')
@@ -157,31 +203,43 @@ def analyze_seed_sequence(seq_func='primes', plot_seqs=True, plot_values=True,
     return seqs, conv_values, conv_times
 
 
-def visualize_backwards_tree(end, n=5, negatives=False, display_in_browser=False):
+@profiled
+def visualize_backwards_tree(end, n=5, negatives=False, display_in_browser=False,
+                             max_depth=None, max_children=None):
     """Generate and visualize a backwards tree from end values.
+
+    The DOT source is streamed to disk and rendered there. SVGs over
+    INLINE_SVG_MAX_BYTES are not displayed; their path is printed instead.
     
     Args:
         end: Tuple of 3 integers representing end values
         n: Number of backward steps to generate
         negatives: Whether to include steps into negative numbers
         display_in_browser: Whether to display the visualization in browser (default: False)
+        max_depth: Collapse nodes more than max_depth levels below the root
+            into "+N collapsed" nodes
+        max_children: Collapse all but the first max_children children of each node
+        profile: If True, print counters and phase timings afterwards
     """
     from IPython.display import SVG, display
     
     root = build_tree(end, n, negatives=negatives)
-    dot = visualize_tree(root)
-    svg_content = view_dot(dot, display_in_browser=display_in_browser)
+    svg_path = render_tree(root, max_depth, max_children, display_in_browser=display_in_browser)
     
     # Display the SVG in the notebook
-    display(SVG(svg_content))
+    if os.path.getsize(svg_path) <= INLINE_SVG_MAX_BYTES:
+        display(SVG(filename=svg_path))
+    else:
+        print(f"SVG is too large to display inline, see {svg_path}")
     
     return root 
 
 
+@profiled
 def print_labeled_backwards_tree(end, n=5, negatives=False):
     tree = build_tree(end, n, negatives=negatives)
-    paths = get_all_paths(tree)
-    paths_labeled = label_all_paths(paths)
+    # Paths are labeled in compact chunks and printed as they stream out
+    paths_labeled = (path for chunk in iter_labeled_path_chunks(iter_paths(tree)) for path in chunk)
     for i, path in enumerate(paths_labeled):
         print(f"Index {i} path:")
 
@@ -0,0 +1,280 @@
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from core import (PREFIX_STABLE_SEEDS, SEED_FUNCTIONS, convergence_stats_many, grid_inits,
+                  inits_from_sequence_view, seed_length)
+from instrumentation import phase
+
+
+##########################################################
+# Parallel grid sweeps
+##########################################################
+
+def _sweep_tile(kind, axes, start, stop):
+    times, values = convergence_stats_many(grid_inits(kind, axes, start, stop))
+    return times, values
+
+
+def _run_sweep(kind, axes, workers, chunk_size):
+    axes = [np.asarray(axis, dtype=np.int64) for axis in axes]
+    shape = tuple(len(axis) for axis in axes)
+    total = int(np.prod(shape))
+    bounds = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # Counters are only collected in this process, so a parallel sweep
+    # records its total time but not the steps taken by the workers
+    with phase('sweep'):
+        if workers == 1 or len(bounds) <= 1:
+            tiles = [_sweep_tile(kind, axes, start, stop) for start, stop in bounds]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                tiles = list(executor.map(_sweep_tile,
+                                          [kind] * len(bounds), [axes] * len(bounds),
+                                          [b[0] for b in bounds], [b[1] for b in bounds]))
+
+    if not tiles:
+        return np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=np.int64)
+    times = np.concatenate([t for t, _ in tiles]).reshape(shape)
+    values = np.concatenate([v for _, v in tiles]).reshape(shape)
+    return times, values
+
+
+def sweep_As_Ds(As, Ds, workers=None, chunk_size=65536):
+    """Convergence times and values over the (a, d) grid of generate_inits_As_Ds.
+
+    The grid is split into tiles of chunk_size inits which are spread over a
+    process pool. Tiles are reassembled in grid order, so the output does not
+    depend on the number of workers.
+
+    Args:
+        As, Ds: Values of a and d
+        workers: Number of worker processes (None for all cores, 1 for in-process)
+        chunk_size: Number of inits per tile
+
+    Returns:
+        (times, values) arrays of shape (len(As), len(Ds))
+    """
+    return _run_sweep('As_Ds', [As, Ds], workers, chunk_size)
+
+
+def sweep_Xs_Ys_Zs(Xs, Ys, Zs, workers=None, chunk_size=65536):
+    """Convergence times and values over the grid of generate_inits_Xs_Ys_Zs.
+
+    Same tiling as sweep_As_Ds.
+
+    Returns:
+        (times, values) arrays of shape (len(Xs), len(Ys), len(Zs))
+    """
+    return _run_sweep('Xs_Ys_Zs', [Xs, Ys, Zs], workers, chunk_size)
+
+
+##########################################################
+# Resumable on-disk sweeps
+##########################################################
+
+class SweepStore:
+    """On-disk results of an (a, d) sweep, filled in tile by tile.
+
+    The store is a directory holding meta.json, memory-mapped times.npy and
+    values.npy of shape (len(As), len(Ds)), and done.npy recording which
+    tiles have been written. A tile is only marked done after its results
+    are flushed, so an interrupted job never leaves a half-written tile
+    marked complete.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.min_a, self.max_a = meta['min_a'], meta['max_a']
+        self.min_d, self.max_d = meta['min_d'], meta['max_d']
+        self.tile_size = meta['tile_size']
+        self.times = np.load(os.path.join(path, 'times.npy'), mmap_mode='r+')
+        self.values = np.load(os.path.join(path, 'values.npy'), mmap_mode='r+')
+        self.done = np.load(os.path.join(path, 'done.npy'), mmap_mode='r+')
+
+    @classmethod
+    def create(cls, path, min_a, max_a, min_d, max_d, tile_size=256):
+        """Create a store for a in [min_a, max_a], d in [min_d, max_d].
+
+        If a store with the same bounds already exists at path it is opened
+        instead, so a rerun picks up where the last one stopped.
+        """
+        meta = {'min_a': min_a, 'max_a': max_a, 'min_d': min_d, 'max_d': max_d,
+                'tile_size': tile_size}
+        meta_path = os.path.join(path, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                existing = json.load(f)
+            if existing != meta:
+                raise ValueError(f'Sweep store at {path} was created with {existing}, not {meta}')
+            return cls(path)
+
+        os.makedirs(path, exist_ok=True)
+        shape = (max_a - min_a + 1, max_d - min_d + 1)
+        tiles = (-(-shape[0] // tile_size), -(-shape[1] // tile_size))
+        for name, dtype, array_shape in (('times', np.int64, shape), ('values', np.int64, shape),
+                                         ('done', np.bool_, tiles)):
+            array = np.lib.format.open_memmap(os.path.join(path, f'{name}.npy'), mode='w+',
+                                              dtype=dtype, shape=array_shape)
+            array.flush()
+            del array
+        # meta.json is written last: its presence means the store is usable
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+        return cls(path)
+
+    def tile_bounds(self, ti, tj):
+        """Index bounds (i0, i1, j0, j1) of tile (ti, tj) in the result arrays"""
+        i0, j0 = ti * self.tile_size, tj * self.tile_size
+        return (i0, min(i0 + self.tile_size, self.times.shape[0]),
+                j0, min(j0 + self.tile_size, self.times.shape[1]))
+
+    def pending_tiles(self):
+        return [tuple(t) for t in np.argwhere(~self.done).tolist()]
+
+    def write_tile(self, ti, tj, times, values):
+        i0, i1, j0, j1 = self.tile_bounds(ti, tj)
+        self.times[i0:i1, j0:j1] = times
+        self.values[i0:i1, j0:j1] = values
+        self.times.flush()
+        self.values.flush()
+        self.done[ti, tj] = True
+        self.done.flush()
+
+    def read_window(self, min_a, max_a, min_d, max_d):
+        """Read back a sub-window of the sweep without recomputing it.
+
+        Returns:
+            (As, Ds, times, values) with times and values of shape
+            (len(As), len(Ds)), as accepted by create_interactive_plot
+        """
+        if min_a < self.min_a or max_a > self.max_a or min_d < self.min_d or max_d > self.max_d:
+            raise ValueError(f'Window a=[{min_a}, {max_a}], d=[{min_d}, {max_d}] is outside the store '
+                             f'a=[{self.min_a}, {self.max_a}], d=[{self.min_d}, {self.max_d}]')
+        i0, i1 = min_a - self.min_a, max_a - self.min_a + 1
+        j0, j1 = min_d - self.min_d, max_d - self.min_d + 1
+        ts = self.tile_size
+        if not self.done[i0 // ts:(i1 - 1) // ts + 1, j0 // ts:(j1 - 1) // ts + 1].all():
+            raise ValueError(f'Sweep store at {self.path} has not finished this window; '
+                             f'rerun run_sweep_job to complete it')
+        As = list(range(min_a, max_a + 1))
+        Ds = list(range(min_d, max_d + 1))
+        return As, Ds, np.array(self.times[i0:i1, j0:j1]), np.array(self.values[i0:i1, j0:j1])
+
+
+def _store_tile(ti, tj, As, Ds):
+    times, values = convergence_stats_many(grid_inits('As_Ds', [As, Ds]))
+    if values.dtype != np.int64:
+        raise OverflowError(f'Convergence values in tile ({ti}, {tj}) do not fit in int64')
+    return ti, tj, times.reshape(len(As), len(Ds)), values.reshape(len(As), len(Ds))
+
+
+def run_sweep_job(path, min_a, max_a, min_d, max_d, tile_size=256, workers=None):
+    """Run an (a, d) sweep into a SweepStore, resuming any earlier run at path.
+
+    Only tiles not yet marked done are computed, and each one is written to
+    disk as soon as it finishes. At most two tiles per worker are in flight,
+    so memory does not grow with the size of the grid.
+
+    Args:
+        path: Directory of the store
+        min/max_a/d: Range bounds for A and D parameters
+        tile_size: Side length of the square tiles the grid is split into
+        workers: Number of worker processes (None for all cores, 1 for in-process)
+
+    Returns:
+        The completed SweepStore
+    """
+    store = SweepStore.create(path, min_a, max_a, min_d, max_d, tile_size)
+    pending = list(store.pending_tiles())
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    def tasks():
+        for ti, tj in pending:
+            i0, i1, j0, j1 = store.tile_bounds(ti, tj)
+            yield ti, tj, np.arange(min_a + i0, min_a + i1), np.arange(min_d + j0, min_d + j1)
+
+    if workers == 1 or len(pending) <= 1:
+        for task in tasks():
+            store.write_tile(*_store_tile(*task))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # A finished future keeps its tile until it is dropped, so only
+            # a bounded set is held and each is discarded once written
+            in_flight = set()
+            for task in tasks():
+                if len(in_flight) >= 2 * workers:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        store.write_tile(*future.result())
+                in_flight.add(executor.submit(_store_tile, *task))
+            for future in wait(in_flight).done:
+                store.write_tile(*future.result())
+    return store
+
+
+##########################################################
+# Multi-seed analysis
+##########################################################
+
+def _analyze_seed_function(seq_func, ns, kwargs):
+    """Window convergence values and times of one seed function for each n"""
+    func = SEED_FUNCTIONS[seq_func]
+    results = {}
+    if seq_func in PREFIX_STABLE_SEEDS:
+        # One seed of the longest length; every shorter seed is a prefix of it,
+        # so its windows' results are a prefix of the long seed's results
+        longest = max(ns)
+        times, values = convergence_stats_many(inits_from_sequence_view(func(longest, **kwargs)))
+        for n in ns:
+            num_windows = max(seed_length(seq_func, n) - 2, 0)
+            results[n] = (values[:num_windows], times[:num_windows])
+    else:
+        for n in ns:
+            times, values = convergence_stats_many(inits_from_sequence_view(func(n, **kwargs)))
+            results[n] = (values, times)
+    return seq_func, results
+
+
+def analyze_seed_functions(seq_funcs=None, ns=(100,), workers=None, func_kwargs=None):
+    """Convergence values and times over sliding windows of many seed sequences.
+
+    Seeds of the functions in PREFIX_STABLE_SEEDS are generated and analyzed
+    once at the largest n, with shorter lengths read off as prefixes. Seed
+    functions are spread over a process pool.
+
+    Args:
+        seq_funcs: Names from SEED_FUNCTIONS (None for all of them; odds_skip
+            is only included when func_kwargs gives its j and k)
+        ns: Seed lengths to analyze
+        workers: Number of worker processes (None for all cores, 1 for in-process)
+        func_kwargs: Dict from seed function name to extra keyword arguments
+
+    Returns:
+        Dict seq_func -> {n: (conv_values, conv_times)} of arrays, the same
+        values analyze_seed_sequence returns for that function and n
+    """
+    func_kwargs = func_kwargs or {}
+    if seq_funcs is None:
+        seq_funcs = [name for name in SEED_FUNCTIONS if name != 'odds_skip' or name in func_kwargs]
+    for name in seq_funcs:
+        if name not in SEED_FUNCTIONS:
+            raise ValueError(f'Invalid sequence function: {name}')
+    ns = sorted(set(ns))
+    tasks = [(name, ns, func_kwargs.get(name, {})) for name in seq_funcs]
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers == 1 or len(tasks) <= 1:
+        results = [_analyze_seed_function(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_analyze_seed_function, *zip(*tasks)))
+    return dict(results)
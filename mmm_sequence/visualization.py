@@ -1,51 +1,170 @@
+import contextlib
+import itertools
+import math
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import tkinter as tk
-import graphviz
 import tempfile
 import os
 import webbrowser
 import time
 
-
-def plot_multiple_curves(y_val_lists, x_val_lists=None, title=None):
-    plt.figure(figsize=(10, 6))
-
-    for i, curve_data in enumerate(y_val_lists):
-        if x_val_lists is None:
-            x_values = list(range(len(curve_data)))
-        else:
-            x_values = x_val_lists[i]
-        plt.plot(x_values, curve_data, label=f'Curve {i+1}')
-
-    plt.xlabel('Index')
-    plt.ylabel('Value')
-    plt.title(title if title else 'Plot')
-    plt.legend()
-    plt.grid(True)
-
-    plt.show()
+from core import SequenceBatch
+from instrumentation import phase
+
+# matplotlib, tkinter and graphviz are imported by the functions that use
+# them, so importing this module loads no plotting or GUI stack
+
+
+# plot_multiple_curves modes: one Line2D per curve with a legend, every
+# curve in a single LineCollection, or a 2D occupancy histogram
+CURVE_MODES = ('auto', 'lines', 'collection', 'density')
+# Above this many curves 'auto' switches from 'lines' to 'collection'
+LINE_CURVE_LIMIT = 100
+# 'collection' draws at most this many evenly spaced curves
+MAX_COLLECTION_CURVES = 5000
+
+
+def _pack_curves(y_val_lists, x_val_lists=None):
+    """Concatenate ragged curves into flat float arrays.
+
+    Returns:
+        (x, y, offsets) where curve i is x[offsets[i]:offsets[i + 1]] against
+        y[offsets[i]:offsets[i + 1]]
+    """
+    if isinstance(y_val_lists, SequenceBatch):
+        # Already packed, so only the x values need building
+        batch = y_val_lists.compact()
+        offsets, lengths = batch.offsets, batch.times
+        y = batch.values.astype(float)
+    else:
+        lengths = np.fromiter((len(curve) for curve in y_val_lists), dtype=np.int64, count=len(y_val_lists))
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        y = np.fromiter(itertools.chain.from_iterable(y_val_lists), dtype=float, count=int(offsets[-1]))
+    total = len(y)
+    if x_val_lists is None:
+        # Index within each curve: a global arange minus each curve's start
+        x = np.arange(total, dtype=float) - np.repeat(offsets[:-1], lengths)
+    else:
+        x = np.fromiter(itertools.chain.from_iterable(x_val_lists), dtype=float, count=total)
+    return x, y, offsets
+
+
+def plot_multiple_curves(y_val_lists, x_val_lists=None, title=None, mode='auto',
+                         max_curves=MAX_COLLECTION_CURVES, bins=512):
+    """Plot many curves, each a list of y values.
+
+    Args:
+        y_val_lists: Curves to plot; they may differ in length. A
+            SequenceBatch is plotted without unpacking it into lists.
+        x_val_lists: x values of each curve (None for 0, 1, 2, ...)
+        title: Plot title
+        mode: One of CURVE_MODES. 'lines' plots each curve separately with a
+            legend. 'collection' draws them as one LineCollection with no
+            legend, keeping max_curves evenly spaced curves when there are
+            more. 'density' shows how many curve points fall in each of
+            bins x bins cells on a log color scale, using every curve.
+            'auto' is 'lines' up to LINE_CURVE_LIMIT curves, else 'collection'.
+        max_curves: Downsampling threshold for 'collection'
+        bins: Histogram cells along each axis for 'density'
+    """
+    if mode not in CURVE_MODES:
+        raise ValueError(f'mode must be one of {CURVE_MODES}')
+    if not isinstance(y_val_lists, (list, np.ndarray, SequenceBatch)):
+        y_val_lists = list(y_val_lists)
+    if x_val_lists is not None and not isinstance(x_val_lists, (list, np.ndarray)):
+        x_val_lists = list(x_val_lists)
+    if mode == 'auto':
+        mode = 'lines' if len(y_val_lists) <= LINE_CURVE_LIMIT else 'collection'
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+    from matplotlib.colors import LogNorm
+
+    with phase('plot'):
+        fig, ax = plt.subplots(figsize=(10, 6))
+        title = title if title else 'Plot'
+
+        if mode == 'lines':
+            for i, curve_data in enumerate(y_val_lists):
+                if x_val_lists is None:
+                    x_values = list(range(len(curve_data)))
+                else:
+                    x_values = x_val_lists[i]
+                ax.plot(x_values, curve_data, label=f'Curve {i+1}')
+            ax.legend()
+        elif len(y_val_lists) > 0:
+            num_curves = len(y_val_lists)
+            if mode == 'collection' and num_curves > max_curves:
+                keep = np.linspace(0, num_curves - 1, max_curves).astype(np.int64)
+                if isinstance(y_val_lists, SequenceBatch):
+                    y_val_lists = y_val_lists.take(keep)
+                else:
+                    y_val_lists = [y_val_lists[i] for i in keep]
+                if x_val_lists is not None:
+                    x_val_lists = [x_val_lists[i] for i in keep]
+                title += f' ({max_curves} of {num_curves} curves)'
+            x, y, offsets = _pack_curves(y_val_lists, x_val_lists)
+
+            if mode == 'collection':
+                points = np.column_stack([x, y])
+                segments = np.split(points, offsets[1:-1])
+                ax.add_collection(LineCollection(segments, linewidths=0.5, alpha=0.3,
+                                                 colors=plt.rcParams['axes.prop_cycle'].by_key()['color']))
+                ax.autoscale()
+            elif x.size:
+                counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+                image = ax.imshow(np.ma.masked_equal(counts.T, 0), origin='lower', aspect='auto',
+                                  extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]),
+                                  norm=LogNorm(), cmap='viridis', interpolation='nearest')
+                fig.colorbar(image, ax=ax, label='Points')
+
+        ax.set_xlabel('Index')
+        ax.set_ylabel('Value')
+        ax.set_title(title)
+        ax.grid(True)
+
+        plt.show()
+
+
+def convergence_grid(data, z_param):
+    """Lay convergence data out on the (a, d) grid.
+
+    Args:
+        data: List of (a, d, convergence_time, convergence_value) tuples as
+            returned by generate_data, or an (As, Ds, times, values) tuple where
+            times and values have shape (len(As), len(Ds)) as returned by
+            sweep_As_Ds
+        z_param: Either 'time' or 'value'
+
+    Returns:
+        (a_values, d_values, Z) with Z[j, i] the convergence z_param at
+        (a_values[i], d_values[j]). Cells missing from data are 0.
+    """
+    if isinstance(data, tuple) and len(data) == 4 and np.ndim(data[2]) == 2:
+        As, Ds, times, values = data
+        Z = np.asarray(times if z_param == 'time' else values)
+        return np.asarray(As), np.asarray(Ds), Z.T
+
+    if len(data) == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros((0, 0), dtype=int)
+    columns = list(zip(*data))
+    a_values, a_idx = np.unique(np.asarray(columns[0]), return_inverse=True)
+    d_values, d_idx = np.unique(np.asarray(columns[1]), return_inverse=True)
+    z = np.asarray(columns[2] if z_param == 'time' else columns[3])
+
+    # Scatter in reverse so the first point wins for repeated (a, d) pairs
+    Z = np.zeros((len(d_values), len(a_values)), dtype=np.result_type(a_values, z))
+    Z[d_idx[::-1], a_idx[::-1]] = z[::-1]
+    return a_values, d_values, Z
 
 
 def plot_3d_surface(data, z_param):
-    # Extract unique a and d values
-    a_values = sorted(set(point[0] for point in data))
-    d_values = sorted(set(point[1] for point in data))
+    import matplotlib.pyplot as plt
+
+    a_values, d_values, Z = convergence_grid(data, z_param)
 
     # Create a 2D grid of a and d values
     A, D = np.meshgrid(a_values, d_values)
 
-    # Create a 2D array for Z values (either convergence_time or convergence_value)
-    Z = np.zeros_like(A)
-
-    # Fill the Z array with the appropriate values
-    for i, a in enumerate(a_values):
-        for j, d in enumerate(d_values):
-            point = next((p for p in data if p[0] == a and p[1] == d), None)
-            if point:
-                Z[j, i] = point[2] if z_param == 'time' else point[3]
-
     # Create the 3D plot
     fig = plt.figure(figsize=(10, 8))
     ax = fig.add_subplot(111, projection='3d')
@@ -65,9 +184,14 @@ def plot_3d_surface(data, z_param):
     return fig, ax
 
 
-def create_interactive_plot(data, z_param):
-    if z_param not in ['time', 'value']:
-        raise ValueError("z_param must be either 'time' or 'value'")
+@contextlib.contextmanager
+def _tk_backend():
+    """Switch matplotlib to interactive TkAgg while a Tk window is set up.
+
+    The original backend, interactive mode and figure.raise_window are
+    restored on exit, before the caller enters the Tk main loop.
+    """
+    import matplotlib.pyplot as plt
 
     # Store original settings
     original_backend = plt.get_backend()
@@ -78,52 +202,321 @@ def create_interactive_plot(data, z_param):
     plt.switch_backend('TkAgg')
     plt.ion()  # Enable interactive mode
     plt.rcParams['figure.raise_window'] = True
+    try:
+        yield
+    finally:
+        # Restore original settings
+        plt.switch_backend(original_backend)
+        if not original_interactive:
+            plt.ioff()
+        plt.rcParams['figure.raise_window'] = original_raise_window
 
-    root = tk.Tk()
-    root.title(f"Interactive 3D Plot - Convergence {z_param}")
 
-    # Create the plot
-    fig, ax = plot_3d_surface(data, z_param)
+def create_interactive_plot(data, z_param):
+    """Show plot_3d_surface in a Tk window. data is as for convergence_grid."""
+    if z_param not in ['time', 'value']:
+        raise ValueError("z_param must be either 'time' or 'value'")
+    import tkinter as tk
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
-    canvas = FigureCanvasTkAgg(fig, master=root)
-    canvas.draw()
-    canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+    with _tk_backend(), phase('plot'):
+        root = tk.Tk()
+        root.title(f"Interactive 3D Plot - Convergence {z_param}")
 
-    # Restore original settings
-    plt.switch_backend(original_backend)
-    if not original_interactive:
-        plt.ioff()
-    plt.rcParams['figure.raise_window'] = original_raise_window
+        # Create the plot
+        fig, ax = plot_3d_surface(data, z_param)
+
+        canvas = FigureCanvasTkAgg(fig, master=root)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
     root.mainloop()
 
 
-def visualize_tree(root):
-    dot = graphviz.Digraph()
-    dot.attr(rankdir='RL')  # Right to Left orientation
+def _masked_for_norm(Z, log):
+    """Z as a float array, with cells a log color scale cannot show masked"""
+    Z = np.asarray(Z, dtype=float)
+    return np.ma.masked_less_equal(Z, 0) if log else Z
+
 
-    def add_nodes(node, conv_value):
-        if node:
-            value = node.value[0]
-            label = str(value)
+def _grid_extent(a_values, d_values):
+    """imshow extent putting each evenly spaced grid value at a cell center"""
+    def bounds(values):
+        step = (values[-1] - values[0]) / (len(values) - 1) if len(values) > 1 else 1
+        return values[0] - step / 2, values[-1] + step / 2
+    return (*bounds(a_values), *bounds(d_values))
 
-            # Check if the value is a multiple of conv_value
-            if value % conv_value != 0:
-                dot.node(str(id(node)), label, style='filled', fillcolor='lightgreen')
-            else:
-                dot.node(str(id(node)), label)
 
-            for child in node.children:
-                if child:
-                    dot.edge(str(id(node)), str(id(child)))
-                    add_nodes(child, conv_value)
+def plot_convergence_heatmap(data, z_param, log=True):
+    """Raster (a, d) convergence map: the imshow counterpart of plot_3d_surface.
 
+    Args:
+        data: As for convergence_grid, on evenly spaced a and d values
+        z_param: Either 'time' or 'value'
+        log: Use a log color scale; cells <= 0 are left blank
+
+    Returns:
+        (fig, ax)
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import LogNorm
+
+    a_values, d_values, Z = convergence_grid(data, z_param)
+    fig, ax = plt.subplots(figsize=(10, 8))
+    image = ax.imshow(_masked_for_norm(Z, log), origin='lower', aspect='auto',
+                      extent=_grid_extent(a_values, d_values), cmap='viridis',
+                      interpolation='nearest', norm=LogNorm() if log else None)
+    ax.set_xlabel('a')
+    ax.set_ylabel('d')
+    ax.set_title(f'Convergence {z_param} over (a, d)')
+    fig.colorbar(image, ax=ax, label='Convergence ' + z_param)
+    return fig, ax
+
+
+def _lod_axis(lo, hi, resolution):
+    """At most resolution evenly strided integers covering [lo, hi], and their stride"""
+    start = math.ceil(lo)
+    stop = max(math.floor(hi), start)
+    step = max(1, -(-(stop - start + 1) // resolution))
+    return np.arange(start, stop + 1, step, dtype=np.int64), step
+
+
+class ConvergenceMap:
+    """Convergence heatmap that recomputes its visible window at screen resolution.
+
+    Each refresh samples at most resolution values of a and d, evenly strided
+    across the current view, and calls compute on just those. Zoomed out, a
+    huge parameter space is shown coarsely; zooming in refines the strides
+    down to every integer.
+
+    Args:
+        ax: Axes to draw on
+        compute: Function (As, Ds) -> (times, values) arrays of shape
+            (len(As), len(Ds)), such as sweep_As_Ds
+        z_param: Either 'time' or 'value'
+        resolution: Most samples along each axis per refresh
+        log: Use a log color scale
+    """
+
+    def __init__(self, ax, compute, z_param, resolution=512, log=True):
+        if z_param not in ['time', 'value']:
+            raise ValueError("z_param must be either 'time' or 'value'")
+        from matplotlib.colors import LogNorm
+
+        self.ax = ax
+        self.compute = compute
+        self.z_param = z_param
+        self.resolution = resolution
+        self.log = log
+        self.image = ax.imshow(np.ma.masked_all((1, 1)), origin='lower', aspect='auto',
+                               cmap='viridis', interpolation='nearest',
+                               norm=LogNorm() if log else None)
+        # Created on the first refresh, once there is data to scale it to
+        self.colorbar = None
+        ax.set_xlabel('a')
+        ax.set_ylabel('d')
+        # Limits only change when the user zooms or pans
+        ax.set_autoscale_on(False)
+
+    def refresh(self, a_lim=None, d_lim=None):
+        """Recompute the map over a_lim x d_lim (default: the current view)"""
+        a_lim = a_lim if a_lim is not None else self.ax.get_xlim()
+        d_lim = d_lim if d_lim is not None else self.ax.get_ylim()
+        As, a_step = _lod_axis(*sorted(a_lim), self.resolution)
+        Ds, d_step = _lod_axis(*sorted(d_lim), self.resolution)
+        with phase('map'):
+            times, values = self.compute(As, Ds)
+            Z = np.asarray(times if self.z_param == 'time' else values).T
+            self.image.set_data(_masked_for_norm(Z, self.log))
+            self.image.set_extent((As[0] - a_step / 2, As[-1] + a_step / 2,
+                                   Ds[0] - d_step / 2, Ds[-1] + d_step / 2))
+            self.image.autoscale()
+        if self.colorbar is None:
+            self.colorbar = self.ax.figure.colorbar(self.image, ax=self.ax,
+                                                    label='Convergence ' + self.z_param)
+        self.ax.set_title(f'Convergence {self.z_param}, {len(As)} x {len(Ds)} '
+                          f'samples, step ({a_step}, {d_step})')
+        return As, Ds
+
+
+def create_interactive_map(compute, z_param, a_range, d_range, resolution=512, log=True):
+    """Show a ConvergenceMap in a Tk window, recomputing it after each zoom or pan.
+
+    Args:
+        compute, z_param, resolution, log: As for ConvergenceMap
+        a_range, d_range: (min, max) of a and d in the initial view
+    """
+    import matplotlib.pyplot as plt
+    import tkinter as tk
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+    with _tk_backend(), phase('plot'):
+        root = tk.Tk()
+        root.title(f"Interactive Convergence Map - Convergence {z_param}")
+
+        fig, ax = plt.subplots(figsize=(10, 8))
+        conv_map = ConvergenceMap(ax, compute, z_param, resolution, log)
+        a_lim = (a_range[0] - 0.5, a_range[1] + 0.5)
+        d_lim = (d_range[0] - 0.5, d_range[1] + 0.5)
+        conv_map.refresh(a_lim, d_lim)
+        ax.set_xlim(a_lim)
+        ax.set_ylim(d_lim)
+
+        canvas = FigureCanvasTkAgg(fig, master=root)
+        canvas.draw()
+        toolbar = NavigationToolbar2Tk(canvas, root)
+        toolbar.update()
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+
+    # A zoom changes xlim and ylim separately; refresh once after both
+    pending = []
+
+    def refresh():
+        pending.clear()
+        conv_map.refresh()
+        canvas.draw_idle()
+
+    def on_limits_changed(_ax):
+        if not pending:
+            pending.append(root.after(100, refresh))
+
+    ax.callbacks.connect('xlim_changed', on_limits_changed)
+    ax.callbacks.connect('ylim_changed', on_limits_changed)
+
+    root.mainloop()
+
+
+# SVGs larger than this are left on disk rather than displayed inline
+INLINE_SVG_MAX_BYTES = 5 * 2**20
+
+
+def _dot_lines(root, max_depth=None, max_children=None):
+    """DOT statements drawing the tree under root, one node or edge per line.
+
+    Nodes are visited with an explicit stack and numbered in visiting order.
+    A node object reached a second time (as in a tree whose identical
+    subtrees are shared) only gets another edge, so each shared subtree is
+    written once. Children below max_depth, and those past the first
+    max_children of a node, are replaced by a single "+N collapsed" node
+    counting the nodes left out.
+    """
     conv_value = root.children[0].value[0]
-    add_nodes(root, conv_value)
+    ids = {id(root): 0}
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        node_id = ids[id(node)]
+        value = node.value[0]
+
+        # Check if the value is a multiple of conv_value
+        if value % conv_value != 0:
+            yield f'\t{node_id} [label="{value}" fillcolor=lightgreen style=filled]\n'
+        else:
+            yield f'\t{node_id} [label="{value}"]\n'
+
+        children = [child for child in node.children if child is not None]
+        if max_depth is not None and depth >= max_depth:
+            shown, hidden = [], children
+        elif max_children is not None and len(children) > max_children:
+            shown, hidden = children[:max_children], children[max_children:]
+        else:
+            shown, hidden = children, []
+
+        new_children = []
+        for child in shown:
+            if id(child) not in ids:
+                ids[id(child)] = len(ids)
+                new_children.append((child, depth + 1))
+            yield f'\t{node_id} -> {ids[id(child)]}\n'
+        if hidden:
+            collapsed = sum(child.get_number_of_nodes() for child in hidden)
+            # Prefixed so summary node ids never clash with node numbers
+            summary_id = f's{node_id}'
+            yield f'\t{summary_id} [label="+{collapsed} collapsed" shape=box style=dashed]\n'
+            yield f'\t{node_id} -> {summary_id}\n'
+        stack.extend(reversed(new_children))
+
+
+def visualize_tree(root, max_depth=None, max_children=None):
+    """graphviz.Digraph of a tree from build_tree, with nodes whose value is not
+    a multiple of the convergence value filled green.
+
+    Args:
+        root: Root returned by build_tree
+        max_depth: Collapse everything more than max_depth levels below root
+        max_children: Collapse all but the first max_children children of a node
+    """
+    import graphviz
+
+    dot = graphviz.Digraph()
+    dot.attr(rankdir='RL')  # Right to Left orientation
+    with phase('dot'):
+        dot.body.extend(_dot_lines(root, max_depth, max_children))
     return dot
 
 
-def view_dot(dot, display_in_browser=False):
+def write_dot(root, path, max_depth=None, max_children=None):
+    """Stream the DOT source of visualize_tree(root, ...) straight to a file.
+
+    Only the traversal stack is held in memory, so this works for trees far
+    too large to build as a graphviz.Digraph.
+
+    Returns:
+        path
+    """
+    with phase('dot'):
+        with open(path, 'w') as f:
+            f.write('digraph {\n\trankdir=RL\n')
+            f.writelines(_dot_lines(root, max_depth, max_children))
+            f.write('}\n')
+    return path
+
+
+def render_dot(path, format='svg'):
+    """Render a DOT file written by write_dot with Graphviz.
+
+    Returns:
+        Path of the rendered file, which is not read back into memory
+    """
+    import graphviz
+
+    with phase('render'):
+        return graphviz.render('dot', format, path)
+
+
+def _open_in_browser(file_path):
+    try:
+        # Try to open with specific browsers in order of preference
+        file_url = 'file://' + os.path.realpath(file_path)
+        success = False
+        
+        # Try Chrome first
+        try:
+            chrome_path = 'open -a "Google Chrome" %s'
+            webbrowser.get(chrome_path).open(file_url)
+            success = True
+        except webbrowser.Error:
+            pass
+            
+        # Try Safari next
+        if not success:
+            try:
+                safari_path = 'open -a "Safari" %s'
+                webbrowser.get(safari_path).open(file_url)
+                success = True
+            except webbrowser.Error:
+                pass
+        
+        # If specific browsers fail, try the default
+        if not success:
+            if not webbrowser.open(file_url):
+                print(f"Could not open browser automatically. Please open this file manually: {file_path}")
+
+    except Exception as e:
+        print(f"Error displaying visualization: {e}")
+
+
+def _tree_file_path():
     # Create MMM_sequence directory if it doesn't exist
     viz_dir = os.path.join(os.getcwd(), 'backwards_trees')
     if not os.path.exists(viz_dir):
@@ -131,46 +524,43 @@ def view_dot(dot, display_in_browser=False):
     
     # Create a unique filename using timestamp
     timestamp = time.strftime("%Y%m%d_%H%M%S")
-    file_path = os.path.join(viz_dir, f'tree_{timestamp}')
+    return os.path.join(viz_dir, f'tree_{timestamp}')
+
+
+def render_tree(root, max_depth=None, max_children=None, display_in_browser=False):
+    """Stream a tree to DOT with write_dot and render it to an SVG under backwards_trees/.
+
+    Returns:
+        Path of the SVG file
+    """
+    dot_path = write_dot(root, _tree_file_path() + '.gv', max_depth, max_children)
+    try:
+        svg_path = render_dot(dot_path)
+    finally:
+        os.remove(dot_path)
+    if display_in_browser:
+        _open_in_browser(svg_path)
+    return svg_path
+
+
+def view_dot(dot, display_in_browser=False, load=True):
+    """Render dot to an SVG under backwards_trees/.
+
+    Returns:
+        The SVG content, or with load=False just the path of the SVG file
+    """
+    file_path = _tree_file_path()
     
     # Render the visualization
-    dot.render(file_path, format='svg', cleanup=True)
+    with phase('render'):
+        dot.render(file_path, format='svg', cleanup=True)
     file_path += '.svg'  # dot.render adds the suffix
 
-    # Read the SVG content
-    with open(file_path, 'r') as f:
-        svg_content = f.read()
-
     if display_in_browser:
-        try:
-            # Try to open with specific browsers in order of preference
-            file_url = 'file://' + os.path.realpath(file_path)
-            success = False
-            
-            # Try Chrome first
-            try:
-                chrome_path = 'open -a "Google Chrome" %s'
-                webbrowser.get(chrome_path).open(file_url)
-                success = True
-            except webbrowser.Error:
-                pass
-                
-            # Try Safari next
-            if not success:
-                try:
-                    safari_path = 'open -a "Safari" %s'
-                    webbrowser.get(safari_path).open(file_url)
-                    success = True
-                except webbrowser.Error:
-                    pass
-            
-            # If specific browsers fail, try the default
-            if not success:
-                if not webbrowser.open(file_url):
-                    print(f"Could not open browser automatically. Please open this file manually: {file_path}")
+        _open_in_browser(file_path)
+    if not load:
+        return file_path
 
-        except Exception as e:
-            print(f"Error displaying visualization: {e}")
-    
     # Return the SVG content for notebook display
-    return svg_content
+    with open(file_path, 'r') as f:
+        return f.read()